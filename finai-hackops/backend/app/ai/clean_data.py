@@ -1,60 +1,152 @@
 import pandas as pd
+import numpy as np
+import argparse
+import importlib.util
 import os
+import time
 
-def clean_data():
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    raw_path = os.path.join(base_dir, "data", "raw", "data.csv")
-    processed_dir = os.path.join(base_dir, "data", "processed")
-    output_path = os.path.join(processed_dir, "finance_training.csv")
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+PROCESSED_DIR = os.path.join(BASE_DIR, "data", "processed")
+# Processed dataset formats.
+# Parquet and Feather need pyarrow; CSV is kept as an opt-in text export.
+PROCESSED_FORMATS = ('parquet', 'feather', 'csv')
 
-    if not os.path.exists(processed_dir):
-        os.makedirs(processed_dir)
+# Selecting relevant columns
+EXPENSE_COLS = ['Rent', 'Loan_Repayment', 'Insurance', 'Groceries', 
+               'Transport', 'Eating_Out', 'Entertainment', 'Utilities', 
+               'Healthcare', 'Education', 'Miscellaneous']
+FEATURE_COLS = ['Income'] + EXPENSE_COLS
+TARGET_COL = 'Desired_Savings_Percentage'
+COLS_TO_KEEP = FEATURE_COLS + [TARGET_COL]
+# Explicit dtypes so pandas skips type inference on every chunk
+COL_DTYPES = {col: 'float64' for col in COLS_TO_KEEP}
 
-    print(f"Loading data from {raw_path}...")
-    df = pd.read_csv(raw_path)
+# Rule-based 'Advice' training labels, by savings ratio bin (highest first)
+ADVICE_LABELS = [
+    "Excellent saving habits! Consider investing more in diversified funds.",
+    "Good job. You have a healthy buffer. Try to cut down on Miscellaneous to save more.",
+    "Tight budget. Focus on reducing Entertainment and Eating Out to build an emergency fund.",
+]
+DEFICIT_ADVICE = "Warning: Expenses exceed income. Immediate budget cuts in non-essentials required."
 
-    # Simplified data for training
-    # We want to predict advice or savings potential
-    # Let's say we want to predict 'Potential_Savings' or 'Desired_Savings'
-    
-    # Selecting relevant columns
-    cols_to_keep = [
-        'Income', 'Rent', 'Loan_Repayment', 'Insurance', 'Groceries', 
-        'Transport', 'Eating_Out', 'Entertainment', 'Utilities', 
-        'Healthcare', 'Education', 'Miscellaneous', 'Desired_Savings_Percentage'
-    ]
-    
-    processed_df = df[cols_to_keep].copy()
-    
-    # Calculate Total Expenses
-    expense_cols = ['Rent', 'Loan_Repayment', 'Insurance', 'Groceries', 
-                   'Transport', 'Eating_Out', 'Entertainment', 'Utilities', 
-                   'Healthcare', 'Education', 'Miscellaneous']
-    processed_df['Total_Expense'] = processed_df[expense_cols].sum(axis=1)
-    
-    # Rule-based 'Advice' for training labels if we want classification
-    # Or we can just use the percentages for regression.
-    # The user request mentioned 'salary planning advice'.
-    
-    def generate_advice(row):
-        savings_ratio = (row['Income'] - row['Total_Expense']) / row['Income'] if row['Income'] > 0 else 0
-        if savings_ratio > 0.3:
-            return "Excellent saving habits! Consider investing more in diversified funds."
-        elif savings_ratio > 0.15:
-            return "Good job. You have a healthy buffer. Try to cut down on Miscellaneous to save more."
-        elif savings_ratio > 0:
-            return "Tight budget. Focus on reducing Entertainment and Eating Out to build an emergency fund."
+def generate_advice(income, total_expense):
+    """Vectorized advice labels for arrays of income and total expense"""
+    income = np.asarray(income, dtype=np.float64)
+    total_expense = np.asarray(total_expense, dtype=np.float64)
+    savings_ratio = np.divide(income - total_expense, income,
+                              out=np.zeros_like(income), where=income > 0)
+    return np.select(
+        [savings_ratio > 0.3, savings_ratio > 0.15, savings_ratio > 0],
+        ADVICE_LABELS,
+        default=DEFICIT_ADVICE
+    )
+
+def processed_path(fmt):
+    return os.path.join(PROCESSED_DIR, f"finance_training.{fmt}")
+
+def has_pyarrow():
+    return importlib.util.find_spec("pyarrow") is not None
+
+class ProcessedWriter:
+    """Appends processed chunks to a single Parquet, Feather (Arrow IPC) or CSV file"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.fmt == 'csv':
+            df.to_csv(self.path, index=False, mode='w' if self._first else 'a', header=self._first)
         else:
-            return "Warning: Expenses exceed income. Immediate budget cuts in non-essentials required."
+            import pyarrow as pa
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if self.fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.path, table.schema)
+            self._writer.write_table(table)
+        self._first = False
 
-    processed_df['Advice'] = processed_df.apply(generate_advice, axis=1)
-    
-    # Let's also keep 'Category' as a feature if we were to use the other dataset, 
-    # but data.csv is tabular across categories.
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def load_processed(columns, fmt=None, memory_map=True):
+    """
+    Load only the given columns of the processed dataset.
+    fmt: force a format; by default the first present of parquet, feather, csv is used,
+    so an opt-in CSV export never displaces a binary dataset
+    """
+    formats = [fmt] if fmt else [f for f in PROCESSED_FORMATS if os.path.exists(processed_path(f))]
+    if not formats:
+        raise FileNotFoundError(f"No processed dataset found in {PROCESSED_DIR}. Run clean_data first.")
+    fmt = formats[0]
+    path = processed_path(fmt)
+    print(f"Loading processed data from {path}...")
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+    if fmt == 'feather':
+        import pyarrow.feather as feather
+        return feather.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+    return pd.read_csv(path, usecols=columns)[columns]
+
+def process_frame(df):
+    """Select training columns and add Total_Expense and Advice"""
+    processed_df = df[COLS_TO_KEEP].copy()
     
+    # Calculate Total Expenses
+    processed_df['Total_Expense'] = processed_df[EXPENSE_COLS].sum(axis=1)
+    processed_df['Advice'] = generate_advice(processed_df['Income'], processed_df['Total_Expense'])
+    return processed_df
+
+def clean_data(chunksize=None, fmt='parquet'):
+    """
+    Build the processed training set from the raw finance data.
+    chunksize: stream the raw CSV in chunks of this many rows instead of loading it whole
+    fmt: 'parquet' (default), 'feather' or 'csv'
+    """
+    raw_path = os.path.join(BASE_DIR, "data", "raw", "data.csv")
+
+    if fmt != 'csv' and not has_pyarrow():
+        print(f"WARNING: pyarrow is not installed; writing CSV instead of {fmt}.")
+        fmt = 'csv'
+    output_path = processed_path(fmt)
+
+    if not os.path.exists(PROCESSED_DIR):
+        os.makedirs(PROCESSED_DIR)
+
+    print(f"Loading data from {raw_path}...")
+    started = time.perf_counter()
+    read_args = dict(usecols=COLS_TO_KEEP, dtype=COL_DTYPES)
+    # Streaming mode: memory stays bounded by the chunk size, not the file size
+    chunks = pd.read_csv(raw_path, chunksize=chunksize, **read_args) if chunksize else [pd.read_csv(raw_path, **read_args)]
+
     print(f"Saving processed data to {output_path}...")
-    processed_df.to_csv(output_path, index=False)
-    print("Data cleaning completed successfully.")
+    rows = 0
+    writer = ProcessedWriter(output_path, fmt)
+    try:
+        for chunk in chunks:
+            processed_df = process_frame(chunk)
+            writer.write(processed_df)
+            rows += len(processed_df)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Data cleaning completed successfully: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
 
 if __name__ == "__main__":
-    clean_data()
+    parser = argparse.ArgumentParser(description="Prepare the salary plan training data")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the raw CSV in chunks of this many rows")
+    parser.add_argument("--format", choices=PROCESSED_FORMATS, default='parquet',
+                        help="Processed dataset format (default: parquet)")
+    args = parser.parse_args()
+    clean_data(chunksize=args.chunksize, fmt=args.format)
@@ -0,0 +1,122 @@
+import os
+import sys
+import numpy as np
+
+# Compiled, scikit-learn-free form of the salary plan model
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "models")
+TREE_PATH = os.path.join(MODEL_DIR, "salary_plan_tree.npz")
+
+# Batches up to this size are walked in plain Python, which beats numpy's per-call overhead
+SCALAR_BATCH_LIMIT = 8
+
+
+class CompiledTree:
+    """
+    Regression tree (or averaged forest) flattened into node arrays.
+    Node i splits on feature[i] at threshold[i]; left[i] == -1 marks a leaf holding value[i].
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.features = list(features)
+        self.n_features_in_ = len(self.features)
+        self.node_count = len(feature)
+        # Python-list copies for the small-batch walk
+        self._nodes = list(zip(feature.tolist(), threshold.tolist(), left.tolist(), right.tolist()))
+        self._values = value.tolist()
+        self._roots = roots.tolist()
+
+    @classmethod
+    def from_estimator(cls, model, features):
+        """Flatten a fitted DecisionTreeRegressor, or a RandomForest/ExtraTrees regressor"""
+        estimators = getattr(model, 'estimators_', None) or [model]
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            children_left = tree.children_left.astype(np.int32)
+            children_right = tree.children_right.astype(np.int32)
+            is_leaf = children_left == -1
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            threshold.append(tree.threshold.astype(np.float64))
+            left.append(np.where(is_leaf, -1, children_left + offset).astype(np.int32))
+            right.append(np.where(is_leaf, -1, children_right + offset).astype(np.int32))
+            value.append(tree.value[:, 0, 0].astype(np.float64))
+            offset += tree.node_count
+        return cls(
+            np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+            np.concatenate(right), np.concatenate(value), np.array(roots, dtype=np.int32), features
+        )
+
+    def save(self, path):
+        # Write then rename so a serving process never loads a partial file
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path, feature=self.feature, threshold=self.threshold, left=self.left,
+            right=self.right, value=self.value, roots=self.roots, features=np.array(self.features)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['feature'], data['threshold'], data['left'], data['right'],
+                data['value'], data['roots'], data['features'].tolist()
+            )
+
+    def predict(self, X):
+        # Match scikit-learn, which compares float32-cast inputs against the thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.shape[0] <= SCALAR_BATCH_LIMIT:
+            return self._predict_small(X)
+
+        total = np.zeros(X.shape[0], dtype=np.float64)
+        rows = np.arange(X.shape[0])
+        for root in self._roots:
+            node = np.full(X.shape[0], root, dtype=np.int32)
+            active = rows if self._nodes[root][2] != -1 else rows[:0]
+            while active.size:
+                current = node[active]
+                go_left = X[active, self.feature[current]] <= self.threshold[current]
+                node[active] = np.where(go_left, self.left[current], self.right[current])
+                active = active[self.left[node[active]] != -1]
+            total += self.value[node]
+        return total / len(self._roots)
+
+    def _predict_small(self, X):
+        nodes, values = self._nodes, self._values
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for i, row in enumerate(X.tolist()):
+            total = 0.0
+            for root in self._roots:
+                node = root
+                feat, thresh, left, right = nodes[node]
+                while left != -1:
+                    node = left if row[feat] <= thresh else right
+                    feat, thresh, left, right = nodes[node]
+                total += values[node]
+            out[i] = total / len(self._roots)
+        return out
+
+
+def export(model_path=None, features_path=None, tree_path=TREE_PATH):
+    """Compile the pickled scikit-learn model into the array format used for serving"""
+    import joblib
+    model_path = model_path or os.path.join(MODEL_DIR, "salary_plan_model.pkl")
+    features_path = features_path or os.path.join(MODEL_DIR, "feature_names.pkl")
+
+    compiled = CompiledTree.from_estimator(joblib.load(model_path), list(joblib.load(features_path)))
+    compiled.save(tree_path)
+    print(f"Compiled {compiled.node_count} nodes to {tree_path}.")
+    return compiled
+
+
+if __name__ == "__main__":
+    export(*sys.argv[1:])
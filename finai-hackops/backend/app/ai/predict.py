@@ -1,65 +1,156 @@
-import joblib
 import os
-import pandas as pd
+import threading
+import time
+import numpy as np
+from .compiled_tree import CompiledTree, TREE_PATH
 
 # Path to model artifacts
 MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "models")
 MODEL_PATH = os.path.join(MODEL_DIR, "salary_plan_model.pkl")
 FEATURES_PATH = os.path.join(MODEL_DIR, "feature_names.pkl")
 
-# Late-load model to avoid issues during startup if training isn't done
-_model = None
-_features = None
+# Memory-map numpy arrays inside the artifacts instead of copying them into each worker
+MODEL_MMAP = os.getenv('FINAI_MODEL_MMAP', '1') == '1'
+# Seconds between checks for a retrained model on disk
+MODEL_RELOAD_INTERVAL = float(os.getenv('FINAI_MODEL_RELOAD_INTERVAL', '30'))
+
+
+class LoadedModel:
+    """Immutable snapshot of one model version and its input layout"""
+
+    def __init__(self, model, features, version, load_seconds):
+        self.model = model
+        self.features = features
+        # Precomputed feature name -> column index for building input matrices
+        self.feature_index = {feat: i for i, feat in enumerate(features)}
+        self.version = version
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """Holds the serving model and swaps in retrained artifacts without a restart"""
+
+    def __init__(self, model_path=MODEL_PATH, features_path=FEATURES_PATH, mmap=MODEL_MMAP, tree_path=TREE_PATH):
+        self.model_path = model_path
+        self.features_path = features_path
+        # Compiled array form of the model; preferred when present so serving skips scikit-learn
+        self.tree_path = tree_path
+        self.mmap = mmap
+        self.current = None
+        self.last_error = None
+        self.reloads = 0
+        self._failed_version = None
+        self._lock = threading.Lock()
+
+    def artifact_paths(self):
+        if self.tree_path and os.path.exists(self.tree_path):
+            return [self.tree_path]
+        return [self.model_path, self.features_path]
+
+    def artifact_version(self):
+        """Version tag derived from the artifacts' mtime and size, or None if missing"""
+        try:
+            stats = [os.stat(path) for path in self.artifact_paths()]
+        except FileNotFoundError:
+            return None
+        return "-".join(f"{st.st_mtime_ns:x}.{st.st_size:x}" for st in stats)
+
+    def _load(self, version):
+        started = time.perf_counter()
+        if self.artifact_paths() == [self.tree_path]:
+            compiled = CompiledTree.load(self.tree_path)
+            return LoadedModel(compiled, compiled.features, version, time.perf_counter() - started)
+
+        import joblib
+        mmap_mode = 'r' if self.mmap else None
+        model = joblib.load(self.model_path, mmap_mode=mmap_mode)
+        features = list(joblib.load(self.features_path))
+        n_features = getattr(model, 'n_features_in_', len(features))
+        if n_features != len(features):
+            raise ValueError(f"model expects {n_features} features but {len(features)} names were saved")
+        # Inputs are built as arrays in training column order, so skip the
+        # per-call DataFrame column-name check
+        if hasattr(model, 'feature_names_in_'):
+            del model.feature_names_in_
+        return LoadedModel(model, features, version, time.perf_counter() - started)
+
+    def refresh(self):
+        """Load the artifacts if they changed on disk; returns True when a new model was swapped in"""
+        with self._lock:
+            version = self.artifact_version()
+            if version is None:
+                if self.current is None and self.last_error is None:
+                    print(f"Warning: Model not found at {self.model_path}. Prediction will return fallback.")
+                    self.last_error = "model artifacts not found"
+                return False
+            if self.current is not None and self.current.version == version:
+                return False
+            if version == self._failed_version:
+                return False
+            try:
+                loaded = self._load(version)
+            except Exception as e:
+                # Keep serving the previous model; a half-written artifact is retried next check
+                self.last_error = str(e)
+                self._failed_version = version
+                print(f"Warning: Failed to load model version {version}: {e}")
+                return False
+            # Single reference assignment: readers see either the old or the new model
+            self.current = loaded
+            self.last_error = None
+            self.reloads += 1
+            print(f"INFO: Loaded salary plan model {version} in {loaded.load_seconds * 1000:.1f} ms.")
+            return True
+
+    def get(self):
+        """Current model snapshot, or None; loading is done by refresh() (the API's lifespan and watcher)"""
+        return self.current
+
+    def info(self):
+        loaded = self.current
+        return {
+            "status": "online" if loaded else "offline",
+            "version": loaded.version if loaded else None,
+            "backend": type(loaded.model).__name__ if loaded else None,
+            "loaded_at": loaded.loaded_at if loaded else None,
+            "load_ms": round(loaded.load_seconds * 1000, 3) if loaded else None,
+            "reloads": self.reloads,
+            # Only the joblib model is memory-mapped; the compiled tree is read into memory
+            "mmap": bool(self.mmap and loaded and not isinstance(loaded.model, CompiledTree)),
+            "last_error": self.last_error,
+        }
+
+
+registry = ModelRegistry()
 
 def load_prediction_model():
-    global _model, _features
-    if _model is None:
-        if os.path.exists(MODEL_PATH) and os.path.exists(FEATURES_PATH):
-            _model = joblib.load(MODEL_PATH)
-            _features = joblib.load(FEATURES_PATH)
-        else:
-            print(f"Warning: Model not found at {MODEL_PATH}. Prediction will return fallback.")
+    return registry.get()
 
-def get_salary_plan(income, expenses_dict):
+def build_feature_matrix(loaded, requests):
     """
-    Generate salary planning advice based on local ML model.
-    income: float
-    expenses_dict: dict of category: amount
+    Build the model input matrix for many requests at once.
+    requests: sequence of (income, expenses_dict) pairs
     """
-    load_prediction_model()
-    
-    if _model is None:
-        return {
-            "advice": "Model is not yet trained. Please check back later.",
-            "status": "offline"
-        }
+    feature_index = loaded.feature_index
+    X = np.zeros((len(requests), len(loaded.features)), dtype=np.float64)
+    income_col = feature_index['Income']
+    misc_col = feature_index['Miscellaneous']
 
-    # Prepare input data matching training features
-    # Standard training features:
-    # ['Income', 'Rent', 'Loan_Repayment', 'Insurance', 'Groceries', 
-    #  'Transport', 'Eating_Out', 'Entertainment', 'Utilities', 
-    #  'Healthcare', 'Education', 'Miscellaneous']
-    
-    input_data = {feat: 0.0 for feat in _features}
-    input_data['Income'] = float(income)
-    
-    # Map input dictionary to fixed features
-    for cat, amount in expenses_dict.items():
-        # Case insensitive match or normalization could be added here
-        if cat in input_data:
-            input_data[cat] = float(amount)
-        else:
-            # Add to miscellaneous if not specifically tracked
-            input_data['Miscellaneous'] += float(amount)
-
-    input_df = pd.DataFrame([input_data])
-    
-    # Ensure column order matches training
-    input_df = input_df[_features]
-    
-    prediction_percent = _model.predict(input_df)[0]
-    
-    # Generate a structured plan based on the predicted percentage
+    for row, (income, expenses_dict) in enumerate(requests):
+        X[row, income_col] = float(income)
+        # Map input dictionary to fixed features
+        for cat, amount in expenses_dict.items():
+            col = feature_index.get(cat)
+            if col is not None:
+                X[row, col] = float(amount)
+            else:
+                # Add to miscellaneous if not specifically tracked
+                X[row, misc_col] += float(amount)
+    return X
+
+def build_plan(income, prediction_percent):
+    """Turn a predicted savings percentage into a structured plan"""
     target_savings = (prediction_percent / 100) * income
     
     if prediction_percent > 30:
@@ -78,7 +169,37 @@ def get_salary_plan(income, expenses_dict):
         "status": "online"
     }
 
+def get_salary_plans(requests):
+    """
+    Generate salary plans for many users with a single model call.
+    requests: sequence of (income, expenses_dict) pairs
+    """
+    loaded = registry.get()
+    requests = list(requests)
+    
+    if loaded is None:
+        return [{
+            "advice": "Model is not yet trained. Please check back later.",
+            "status": "offline"
+        } for _ in requests]
+
+    if not requests:
+        return []
+
+    predictions = loaded.model.predict(build_feature_matrix(loaded, requests))
+    return [build_plan(float(income), float(pred)) for (income, _), pred in zip(requests, predictions)]
+
+def get_salary_plan(income, expenses_dict):
+    """
+    Generate salary planning advice based on local ML model.
+    income: float
+    expenses_dict: dict of category: amount
+    """
+    return get_salary_plans([(income, expenses_dict)])[0]
+
 if __name__ == "__main__":
+    # Outside the API nothing has loaded the model yet
+    registry.refresh()
     # Test prediction
     sample_expenses = {
         "Rent": 5000,
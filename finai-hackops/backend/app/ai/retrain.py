@@ -0,0 +1,186 @@
+import argparse
+import os
+import sys
+import time
+from datetime import date
+import pandas as pd
+from ..db.database import Database
+from .clean_data import EXPENSE_COLS, FEATURE_COLS, TARGET_COL, PROCESSED_DIR, load_processed
+from .train_model import train_model
+
+# Per-user monthly aggregates built from the live transactions table, plus the
+# high-water mark (last transactions.id ingested) so each run only reads new rows
+LIVE_DB_PATH = os.path.join(PROCESSED_DIR, "live_training.db")
+BATCH_SIZE = 5000
+# Retrain only once this many new transactions have been ingested
+MIN_NEW_ROWS = 500
+
+STATE_SQL = [
+    "CREATE TABLE IF NOT EXISTS monthly_aggregates (user_id INTEGER NOT NULL, month TEXT NOT NULL, "
+    + ", ".join(f"{col} REAL NOT NULL DEFAULT 0" for col in FEATURE_COLS)
+    + ", PRIMARY KEY (user_id, month))",
+    "CREATE TABLE IF NOT EXISTS ingest_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+UPSERT_SQL = (
+    f"INSERT INTO monthly_aggregates (user_id, month, {', '.join(FEATURE_COLS)}) "
+    f"VALUES (?, ?, {', '.join('?' for _ in FEATURE_COLS)}) "
+    "ON CONFLICT (user_id, month) DO UPDATE SET "
+    + ", ".join(f"{col} = {col} + excluded.{col}" for col in FEATURE_COLS)
+)
+
+SET_STATE_SQL = (
+    "INSERT INTO ingest_state (key, value) VALUES (?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+)
+
+class BaseDatasetMissing(Exception):
+    """No processed training dataset to combine the live rows with"""
+
+
+_normalized_cols = {col.lower(): col for col in EXPENSE_COLS}
+
+
+def feature_column(category):
+    """Training column for a transaction category; untracked categories count as Miscellaneous"""
+    if category in EXPENSE_COLS:
+        return category
+    key = str(category).strip().lower().replace(' ', '_').replace('-', '_')
+    return _normalized_cols.get(key, 'Miscellaneous')
+
+
+def open_live_db(path=LIVE_DB_PATH):
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    live_db = Database(path)
+    with live_db.transaction() as conn:
+        for sql in STATE_SQL:
+            conn.execute(sql)
+    return live_db
+
+
+def get_state(live_db, key):
+    row = live_db.fetch_one("SELECT value FROM ingest_state WHERE key = ?", (key,))
+    return row['value'] if row else 0
+
+
+def high_water_mark(live_db):
+    return get_state(live_db, 'transactions_id')
+
+
+def ingest(app_db, live_db, batch_size=BATCH_SIZE):
+    """Fold transactions newer than the high-water mark into the monthly aggregates; returns rows read"""
+    last_id = high_water_mark(live_db)
+    pending = get_state(live_db, 'pending_rows')
+    ingested = 0
+
+    while True:
+        rows = app_db.fetch_all(
+            """SELECT id, user_id, transaction_type, amount, category, transaction_date
+               FROM transactions WHERE id > ? ORDER BY id LIMIT ?""",
+            (last_id, batch_size)
+        )
+        if not rows:
+            break
+
+        deltas = {}
+        for row in rows:
+            if row['transaction_type'] == 'income':
+                col = 'Income'
+            elif row['transaction_type'] == 'expense':
+                col = feature_column(row['category'])
+            else:
+                # Investments are money saved, not spent
+                continue
+            key = (row['user_id'], str(row['transaction_date'])[:7])
+            values = deltas.setdefault(key, dict.fromkeys(FEATURE_COLS, 0.0))
+            values[col] += abs(float(row['amount']))
+
+        last_id = rows[-1]['id']
+        pending += len(rows)
+        with live_db.transaction() as conn:
+            conn.executemany(
+                UPSERT_SQL,
+                [(user_id, month, *(values[col] for col in FEATURE_COLS))
+                 for (user_id, month), values in deltas.items()]
+            )
+            conn.execute(SET_STATE_SQL, ('transactions_id', last_id))
+            conn.execute(SET_STATE_SQL, ('pending_rows', pending))
+        ingested += len(rows)
+
+    return ingested
+
+
+def load_live_frame(live_db):
+    """Training rows from completed months: features plus the savings percentage achieved"""
+    current_month = date.today().strftime('%Y-%m')
+    rows = live_db.fetch_all(
+        "SELECT * FROM monthly_aggregates WHERE Income > 0 AND month < ?", (current_month,)
+    )
+    df = pd.DataFrame(rows, columns=['user_id', 'month'] + FEATURE_COLS)
+    total_expense = df[EXPENSE_COLS].sum(axis=1)
+    df[TARGET_COL] = ((df['Income'] - total_expense) / df['Income'] * 100).clip(lower=-100)
+    return df[FEATURE_COLS + [TARGET_COL]]
+
+
+def retrain(app_db=None, live_db=None, min_new_rows=MIN_NEW_ROWS, force=False, search=None, live_only=False):
+    """
+    Ingest new transactions and retrain once enough have arrived; returns True if retrained.
+    Live rows are combined in memory with the processed dataset (which is left unchanged);
+    without that dataset, BaseDatasetMissing is raised unless live_only is set.
+    """
+    app_db = app_db or Database()
+    live_db = live_db or open_live_db()
+
+    started = time.perf_counter()
+    new_rows = ingest(app_db, live_db)
+    print(f"Ingested {new_rows} new transactions in {time.perf_counter() - started:.2f}s "
+          f"(high-water mark {high_water_mark(live_db)}).")
+    pending = get_state(live_db, 'pending_rows')
+    if pending < min_new_rows and not force:
+        print(f"Skipping retrain: {pending} of {min_new_rows} new transactions since the last training.")
+        return False
+
+    frames = [load_live_frame(live_db)]
+    try:
+        frames.insert(0, load_processed(FEATURE_COLS + [TARGET_COL]))
+    except FileNotFoundError:
+        # Live rows alone (and their achieved-savings target) must not silently replace the shipped model
+        if not live_only:
+            raise BaseDatasetMissing(
+                "No processed dataset found; run `python -m app.ai.clean_data` first, "
+                "or pass --live-only to train on live transactions alone."
+            )
+        print("No processed dataset found; training on live data only.")
+    df = pd.concat(frames, ignore_index=True)
+    if df.empty:
+        print("Skipping retrain: no completed months with income yet.")
+        return False
+
+    print(f"Retraining on {len(df)} rows ({len(frames[-1])} from live transactions)...")
+    train_model(search=search, df=df)
+    live_db.execute_query(SET_STATE_SQL, ('pending_rows', 0))
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain the salary plan model from live transactions")
+    parser.add_argument("--every", type=float, default=None,
+                        help="Keep running and check for new transactions every N seconds")
+    parser.add_argument("--min-new-rows", type=int, default=MIN_NEW_ROWS,
+                        help="New transactions required before retraining")
+    parser.add_argument("--force", action="store_true", help="Retrain even without new transactions")
+    parser.add_argument("--search", choices=["grid", "random"], default=None,
+                        help="Run the train_model hyperparameter search")
+    parser.add_argument("--live-only", action="store_true",
+                        help="Allow training on live transactions alone when there is no processed dataset")
+    args = parser.parse_args()
+
+    try:
+        retrain(min_new_rows=args.min_new_rows, force=args.force, search=args.search, live_only=args.live_only)
+        while args.every:
+            time.sleep(args.every)
+            retrain(min_new_rows=args.min_new_rows, search=args.search, live_only=args.live_only)
+    except BaseDatasetMissing as e:
+        print(f"Error: {e}")
+        sys.exit(1)
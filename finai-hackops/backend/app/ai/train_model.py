@@ -1,37 +1,201 @@
-import pandas as pd
 from sklearn.tree import DecisionTreeClassifier
 import joblib
+import argparse
+import itertools
+import json
 import os
+import random
+import time
+import numpy as np
+from .compiled_tree import CompiledTree, TREE_PATH
+from .clean_data import FEATURE_COLS, TARGET_COL, load_processed
 
-def train_model():
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    processed_path = os.path.join(base_dir, "data", "processed", "finance_training.csv")
-    model_dir = os.path.join(os.path.dirname(base_dir), "models")
-    model_path = os.path.join(model_dir, "salary_plan_model.pkl")
-    feature_names_path = os.path.join(model_dir, "feature_names.pkl")
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+MODEL_DIR = os.path.join(os.path.dirname(BASE_DIR), "models")
+REPORT_PATH = os.path.join(MODEL_DIR, "training_report.json")
 
-    if not os.path.exists(model_dir):
-        os.makedirs(model_dir)
+# Hyperparameter search space. Only tree models that compiled_tree can flatten
+# (single trees and averaged forests) are searched, so the winner stays servable.
+SEARCH_SPACE = {
+    "decision_tree": {
+        "max_depth": [None, 6, 8, 10, 12, 16, 20],
+        "min_samples_leaf": [1, 5, 10, 20, 50],
+    },
+    "random_forest": {
+        "n_estimators": [20, 50],
+        "max_depth": [8, 12, 16],
+        "min_samples_leaf": [5, 20],
+    },
+    "extra_trees": {
+        "n_estimators": [20, 50],
+        "max_depth": [8, 12, 16],
+        "min_samples_leaf": [5, 20],
+    },
+}
 
-    print(f"Loading processed data from {processed_path}...")
-    df = pd.read_csv(processed_path)
+def make_estimator(kind, params):
+    if kind == "decision_tree":
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(random_state=42, **params)
+    if kind == "random_forest":
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    if kind == "extra_trees":
+        from sklearn.ensemble import ExtraTreesRegressor
+        return ExtraTreesRegressor(random_state=42, n_jobs=1, **params)
+    raise ValueError(f"Unknown model kind: {kind}")
 
-    # Features: Income and detailed expenses
-    X = df.drop(columns=['Advice', 'Total_Expense', 'Desired_Savings_Percentage'])
-    y = df['Desired_Savings_Percentage']
+def candidates(search, n_iter, seed=42):
+    """Expand SEARCH_SPACE into (kind, params) pairs; 'random' samples n_iter of them"""
+    grid = []
+    for kind, space in SEARCH_SPACE.items():
+        keys = list(space)
+        for values in itertools.product(*(space[k] for k in keys)):
+            grid.append((kind, dict(zip(keys, values))))
+    if search == "random" and n_iter < len(grid):
+        grid = random.Random(seed).sample(grid, n_iter)
+    return grid
 
-    print("Training DecisionTreeRegressor...")
-    from sklearn.tree import DecisionTreeRegressor
-    model = DecisionTreeRegressor(random_state=42)
-    model.fit(X, y)
+def measure_latency(compiled, X, repeats=200):
+    """Median single-row and per-row batch predict latency (microseconds) of the served form"""
+    row = X[:1]
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        compiled.predict(row)
+        timings.append(time.perf_counter() - started)
+    batch = X[:1000]
+    started = time.perf_counter()
+    compiled.predict(batch)
+    batch_seconds = time.perf_counter() - started
+    return float(np.median(timings) * 1e6), float(batch_seconds / len(batch) * 1e6)
+
+def evaluate_candidate(kind, params, X, y, cv):
+    """Cross-validate one candidate and time its compiled predictor"""
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.model_selection import KFold
+
+    r2_scores, mae_scores = [], []
+    started = time.perf_counter()
+    for train_idx, val_idx in KFold(n_splits=cv, shuffle=True, random_state=42).split(X):
+        model = make_estimator(kind, params)
+        model.fit(X[train_idx], y[train_idx])
+        predictions = model.predict(X[val_idx])
+        r2_scores.append(r2_score(y[val_idx], predictions))
+        mae_scores.append(mean_absolute_error(y[val_idx], predictions))
+    fit_seconds = time.perf_counter() - started
+
+    compiled = CompiledTree.from_estimator(model, FEATURE_COLS)
+    single_us, batch_us = measure_latency(compiled, X)
+    return {
+        "kind": kind,
+        "params": params,
+        "r2_mean": float(np.mean(r2_scores)),
+        "r2_std": float(np.std(r2_scores)),
+        "mae_mean": float(np.mean(mae_scores)),
+        "predict_single_us": single_us,
+        "predict_batch_us_per_row": batch_us,
+        "node_count": compiled.node_count,
+        "cv_fit_seconds": fit_seconds,
+    }
+
+def select_best(results, max_latency_us=None):
+    """Highest mean R² within the latency budget; faster candidate wins a tie"""
+    eligible = [r for r in results if max_latency_us is None or r["predict_single_us"] <= max_latency_us]
+    if not eligible:
+        print(f"WARNING: No candidate meets the {max_latency_us}us latency budget; ignoring it.")
+        eligible = results
+    return max(eligible, key=lambda r: (round(r["r2_mean"], 4), -r["predict_single_us"]))
+
+def search_model(X, y, search="grid", n_iter=20, cv=5, n_jobs=-1, max_latency_us=None):
+    """Evaluate candidates in parallel worker processes and return (best, all results)"""
+    from joblib import Parallel, delayed
+
+    grid = candidates(search, n_iter)
+    print(f"Evaluating {len(grid)} candidates with {cv}-fold CV (n_jobs={n_jobs})...")
+    results = Parallel(n_jobs=n_jobs, backend="loky", verbose=5)(
+        delayed(evaluate_candidate)(kind, params, X, y, cv) for kind, params in grid
+    )
+    results.sort(key=lambda r: r["r2_mean"], reverse=True)
+    return select_best(results, max_latency_us), results
+
+def save_model(model, features, report=None):
+    model_path = os.path.join(MODEL_DIR, "salary_plan_model.pkl")
+    feature_names_path = os.path.join(MODEL_DIR, "feature_names.pkl")
 
     print(f"Saving model to {model_path}...")
-    joblib.dump(model, model_path)
+    # Write to temp files and rename so a serving process never loads a partial artifact
+    joblib.dump(features, feature_names_path + ".tmp")
+    joblib.dump(model, model_path + ".tmp")
     
     # We also need to save the feature names to ensure consistency in prediction
-    joblib.dump(list(X.columns), feature_names_path)
-    
+    os.replace(feature_names_path + ".tmp", feature_names_path)
+    os.replace(model_path + ".tmp", model_path)
+
+    # Export the array form served by the API without scikit-learn
+    CompiledTree.from_estimator(model, features).save(TREE_PATH)
+
+    if report is not None:
+        with open(REPORT_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved training report to {REPORT_PATH}.")
+
+def train_model(search=None, n_iter=20, cv=5, n_jobs=-1, max_latency_us=None, df=None):
+    """
+    Train the salary plan model.
+    search: None fits the single default tree; 'grid' or 'random' runs a cross-validated
+    hyperparameter search across worker processes and keeps the best candidate
+    df: training frame with FEATURE_COLS and TARGET_COL; defaults to the processed dataset
+    """
+    if not os.path.exists(MODEL_DIR):
+        os.makedirs(MODEL_DIR)
+
+    # Features: Income and detailed expenses (column projection skips Advice/Total_Expense)
+    if df is None:
+        df = load_processed(FEATURE_COLS + [TARGET_COL])
+    X = df[FEATURE_COLS]
+    y = df[TARGET_COL]
+
+    if search is None:
+        print("Training DecisionTreeRegressor...")
+        from sklearn.tree import DecisionTreeRegressor
+        model = DecisionTreeRegressor(random_state=42)
+        model.fit(X, y)
+        save_model(model, list(X.columns))
+        print("Model training completed successfully.")
+        return
+
+    started = time.perf_counter()
+    best, results = search_model(
+        X.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64),
+        search=search, n_iter=n_iter, cv=cv, n_jobs=n_jobs, max_latency_us=max_latency_us
+    )
+    print(f"Best candidate: {best['kind']} {best['params']} "
+          f"(R2={best['r2_mean']:.4f}, MAE={best['mae_mean']:.3f}, predict={best['predict_single_us']:.1f}us)")
+
+    print("Refitting best candidate on the full dataset...")
+    model = make_estimator(best["kind"], best["params"])
+    model.fit(X, y)
+    save_model(model, list(X.columns), report={
+        "search": search,
+        "cv": cv,
+        "rows": len(df),
+        "max_latency_us": max_latency_us,
+        "search_seconds": time.perf_counter() - started,
+        "best": best,
+        "candidates": results,
+    })
     print("Model training completed successfully.")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the salary plan model")
+    parser.add_argument("--search", choices=["grid", "random"], default=None,
+                        help="Run a cross-validated hyperparameter search instead of the default tree")
+    parser.add_argument("--n-iter", type=int, default=20, help="Candidates sampled by --search random")
+    parser.add_argument("--cv", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Worker processes (-1 uses all cores)")
+    parser.add_argument("--max-latency-us", type=float, default=None,
+                        help="Only keep candidates whose single-row predict takes at most this many microseconds")
+    args = parser.parse_args()
+    train_model(search=args.search, n_iter=args.n_iter, cv=args.cv,
+                n_jobs=args.n_jobs, max_latency_us=args.max_latency_us)
@@ -1,95 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import Optional
-from ..services.gemini_service import GeminiFinancialAssistant
-from ..db.database import Database
-
-router = APIRouter()
-gemini = GeminiFinancialAssistant()
-db = Database()
-
-class AnalysisRequest(BaseModel):
-    user_id: int
-    analysis_type: str
-
-class SalaryPlanRequest(BaseModel):
-    user_id: int
-    income: float
-    expenses: dict
-
-@router.post("/salary-plan")
-async def get_salary_plan_api(request: SalaryPlanRequest):
-    advice = gemini.budget_assistant(request.income, request.expenses)
-    
-    # Save analysis
-    db.execute_query(
-        "INSERT INTO ai_analysis (user_id, analysis_type, prompt, ai_response) VALUES (?, ?, ?, ?)",
-        (request.user_id, "salary_plan", str(request.expenses), advice)
-    )
-    
-    return {"advice": advice}
-
-@router.post("/analyze-spending")
-async def analyze_spending(request: AnalysisRequest):
-    # Fetch transactions for user
-    transactions = db.fetch_all(
-        "SELECT category, SUM(amount) as total FROM transactions WHERE user_id = ? GROUP BY category",
-        (request.user_id,)
-    )
-    
-    if not transactions:
-        return {"analysis": "No transaction data found for analysis."}
-    
-    transactions_text = "\n".join([f"- {t['category']}: ${t['total']}" for t in transactions])
-    
-    analysis = gemini.analyze_spending(transactions_text)
-    
-    # Save analysis
-    db.execute_query(
-        "INSERT INTO ai_analysis (user_id, analysis_type, prompt, ai_response) VALUES (?, ?, ?, ?)",
-        (request.user_id, request.analysis_type, transactions_text, analysis)
-    )
-    
-    return {"analysis": analysis}
-
-class ChatRequest(BaseModel):
-    user_id: int
-    message: str
-    session_id: str
-
-@router.post("/chat")
-async def chat(request: ChatRequest):
-    # 1. Fetch user financial context for intent routing
-    transactions = db.fetch_all("SELECT transaction_type, category, amount FROM transactions WHERE user_id = ?", (request.user_id,))
-    
-    income = 0
-    expenses_dict = {}
-    
-    for t in transactions:
-        if t['transaction_type'] == 'income':
-            income += t['amount']
-        else:
-            cat = t['category']
-            expenses_dict[cat] = expenses_dict.get(cat, 0) + abs(t['amount'])
-    
-    financial_data = {
-        "income": income,
-        "expenses": expenses_dict
-    }
-
-    # 2. Save user message
-    db.execute_query(
-        "INSERT INTO chat_history (user_id, message, sender, session_id) VALUES (?, ?, 'user', ?)",
-        (request.user_id, request.message, request.session_id)
-    )
-    
-    # 3. Call AI assistant with context
-    ai_response = gemini.chat_assistant(request.message, financial_data=financial_data)
-    
-    # 4. Save AI response
-    db.execute_query(
-        "INSERT INTO chat_history (user_id, message, sender, session_id) VALUES (?, ?, 'ai', ?)",
-        (request.user_id, ai_response, request.session_id)
-    )
-    
-    return {"response": ai_response}
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
+from typing import Optional
+import json
+from ..services.gemini_service import GeminiFinancialAssistant
+from ..db.database import AsyncDatabase
+from ..db.write_behind import write_behind
+from ..services.financial_context import financial_context
+from ..services.chat_history import chat_history
+
+router = APIRouter()
+db = AsyncDatabase()
+
+# Audit rows are written behind the response by the batching queue
+INSERT_ANALYSIS_SQL = "INSERT INTO ai_analysis (user_id, analysis_type, prompt, ai_response) VALUES (?, ?, ?, ?)"
+INSERT_CHAT_SQL = "INSERT INTO chat_history (user_id, message, sender, session_id) VALUES (?, ?, ?, ?)"
+
+def get_assistant(request: Request) -> GeminiFinancialAssistant:
+    """The assistant created once per process by the app lifespan"""
+    return request.app.state.gemini
+
+class AnalysisRequest(BaseModel):
+    user_id: int
+    analysis_type: str
+
+class SalaryPlanRequest(BaseModel):
+    user_id: int
+    income: float
+    expenses: dict
+
+@router.post("/salary-plan")
+async def get_salary_plan_api(request: SalaryPlanRequest, gemini: GeminiFinancialAssistant = Depends(get_assistant)):
+    advice = gemini.budget_assistant(request.income, request.expenses)
+    
+    # Save analysis
+    write_behind.enqueue(INSERT_ANALYSIS_SQL, (request.user_id, "salary_plan", str(request.expenses), advice))
+    
+    return {"advice": advice}
+
+@router.post("/analyze-spending")
+async def analyze_spending(request: AnalysisRequest, gemini: GeminiFinancialAssistant = Depends(get_assistant)):
+    # Fetch transactions for user
+    transactions = await db.fetch_all(
+        "SELECT category, SUM(total) as total FROM category_totals WHERE user_id = ? GROUP BY category",
+        (request.user_id,)
+    )
+    
+    if not transactions:
+        return {"analysis": "No transaction data found for analysis."}
+    
+    transactions_text = "\n".join([f"- {t['category']}: ${t['total']}" for t in transactions])
+    
+    analysis = await gemini.analyze_spending(transactions_text)
+    
+    # Save analysis
+    write_behind.enqueue(INSERT_ANALYSIS_SQL, (request.user_id, request.analysis_type, transactions_text, analysis))
+    
+    return {"analysis": analysis}
+
+class ChatRequest(BaseModel):
+    user_id: int
+    message: str
+    session_id: str
+
+@router.post("/chat")
+async def chat(request: ChatRequest, gemini: GeminiFinancialAssistant = Depends(get_assistant)):
+    # 1. Fetch user financial context for intent routing, and the conversation so far
+    financial_data = await financial_context.get(request.user_id)
+    context = await chat_history.context(request.user_id, request.session_id)
+
+    # 2. Save user message
+    write_behind.enqueue(INSERT_CHAT_SQL, (request.user_id, request.message, 'user', request.session_id))
+    chat_history.append(request.user_id, request.session_id, 'user', request.message)
+    
+    # 3. Call AI assistant with context
+    ai_response = await gemini.chat_assistant(request.message, context=context, financial_data=financial_data)
+    
+    # 4. Save AI response
+    write_behind.enqueue(INSERT_CHAT_SQL, (request.user_id, ai_response, 'ai', request.session_id))
+    chat_history.append(request.user_id, request.session_id, 'ai', ai_response)
+    
+    return {"response": ai_response}
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, gemini: GeminiFinancialAssistant = Depends(get_assistant)):
+    """Server-Sent Events variant of /chat: chunks are sent as they are generated"""
+    financial_data = await financial_context.get(request.user_id)
+    context = await chat_history.context(request.user_id, request.session_id)
+    chunks = []
+
+    async def events():
+        async for chunk in gemini.chat_assistant_stream(request.message, context=context,
+                                                        financial_data=financial_data):
+            chunks.append(chunk)
+            yield f"data: {json.dumps({'delta': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    async def record_chat():
+        # Runs after the stream has finished, off the latency-critical path
+        if chunks:
+            ai_response = "".join(chunks)
+            write_behind.enqueue(INSERT_CHAT_SQL, (request.user_id, request.message, 'user', request.session_id))
+            write_behind.enqueue(INSERT_CHAT_SQL, (request.user_id, ai_response, 'ai', request.session_id))
+            chat_history.append(request.user_id, request.session_id, 'user', request.message)
+            chat_history.append(request.user_id, request.session_id, 'ai', ai_response)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(record_chat),
+    )
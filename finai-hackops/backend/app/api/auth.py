@@ -1,97 +1,116 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-from google.oauth2 import id_token
-from google.auth.transport import requests
-from ..db.database import Database
-
-router = APIRouter()
-db = Database()
-
-class UserCreate(BaseModel):
-    email: EmailStr
-    username: str
-    password: str
-    full_name: Optional[str] = None
-
-class UserLogin(BaseModel):
-    email: EmailStr
-    password: str
-
-@router.post("/signup")
-async def signup(user: UserCreate):
-    # Check if user exists
-    existing_user = db.fetch_one("SELECT * FROM users WHERE email = ? OR username = ?", (user.email, user.username))
-    if existing_user:
-        raise HTTPException(status_code=400, detail="User already exists")
-    
-    # Simple hash for now (should use passlib)
-    password_hash = f"hashed_{user.password}"
-    
-    user_id = db.execute_query(
-        "INSERT INTO users (email, username, password_hash, full_name) VALUES (?, ?, ?, ?)",
-        (user.email, user.username, password_hash, user.full_name)
-    )
-    
-    return {"id": user_id, "email": user.email, "message": "User created successfully"}
-
-@router.post("/login")
-async def login(user: UserLogin):
-    db_user = db.fetch_one("SELECT * FROM users WHERE email = ?", (user.email,))
-    if not db_user:
-        raise HTTPException(status_code=400, detail="Invalid credentials")
-    
-    # Check "hashed" password
-    if db_user['password_hash'] != f"hashed_{user.password}":
-        raise HTTPException(status_code=400, detail="Invalid credentials")
-    
-    return {"message": "Login successful", "user": {"id": db_user['id'], "email": db_user['email'], "username": db_user['username']}}
-
-class GoogleToken(BaseModel):
-    token: str
-
-@router.post("/google")
-async def google_auth(data: GoogleToken):
-    try:
-        # Specify the CLIENT_ID of the app that accesses the backend:
-        CLIENT_ID = "743696234738-4s6o73beo374rbc7polnpgk38hshfi77.apps.googleusercontent.com"
-        idinfo = id_token.verify_oauth2_token(data.token, requests.Request(), CLIENT_ID, clock_skew_in_seconds=10)
-
-        # ID token is valid. Get the user's Google Account ID from the decoded token.
-        email = idinfo['email']
-        name = idinfo.get('name', '')
-        
-        # Check if user exists
-        db_user = db.fetch_one("SELECT * FROM users WHERE email = ?", (email,))
-        
-        if not db_user:
-            # Create new user for Google Sign-In
-            username = email.split('@')[0]
-            # Check if username exists (could happen if different email has same prefix, though unlikely for Google)
-            existing_username = db.fetch_one("SELECT * FROM users WHERE username = ?", (username,))
-            if existing_username:
-                import random
-                username = f"{username}{random.randint(100, 999)}"
-            
-            # Using a placeholder hash for Google users
-            password_hash = "google_oauth_user"
-            
-            user_id = db.execute_query(
-                "INSERT INTO users (email, username, password_hash, full_name) VALUES (?, ?, ?, ?)",
-                (email, username, password_hash, name)
-            )
-            db_user = {"id": user_id, "email": email, "username": username, "full_name": name}
-        
-        return {
-            "message": "Google Login successful", 
-            "user": {
-                "id": db_user['id'], 
-                "email": db_user['email'], 
-                "username": db_user['username'],
-                "full_name": db_user.get('full_name')
-            }
-        }
-    except ValueError as e:
-        # Invalid token
-        print(f"Google Auth Error: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"Invalid Google token: {str(e)}")
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, EmailStr
+from typing import Optional
+import asyncio
+import random
+from ..db.database import AsyncDatabase
+from ..services.google_tokens import CertificatesUnavailable, google_verifier
+from ..services.passwords import password_hasher
+
+router = APIRouter()
+db = AsyncDatabase()
+
+# Uniqueness is enforced by the email/username constraints in the same statement,
+# so concurrent registrations can't both pass a separate existence check
+INSERT_USER_SQL = """INSERT INTO users (email, username, password_hash, full_name) VALUES (?, ?, ?, ?)
+                     ON CONFLICT DO NOTHING RETURNING id"""
+# Google sign-in: an email registered concurrently returns the existing row; a taken
+# username returns nothing, and the caller retries with a suffix
+INSERT_GOOGLE_USER_SQL = """INSERT INTO users (email, username, password_hash, full_name) VALUES (?, ?, ?, ?)
+                            ON CONFLICT (email) DO UPDATE SET email = excluded.email
+                            ON CONFLICT (username) DO NOTHING
+                            RETURNING id, email, username, full_name"""
+# Placeholder hash for Google users; it never matches a password
+GOOGLE_PASSWORD_HASH = "google_oauth_user"
+USERNAME_ATTEMPTS = 8
+
+def insert_user(conn, email, username, password_hash, full_name):
+    """New user's id, or None when the email or username is taken"""
+    row = conn.execute(INSERT_USER_SQL, (email, username, password_hash, full_name)).fetchone()
+    return row['id'] if row else None
+
+def insert_google_user(conn, email, full_name):
+    """Create (or return) the user for a Google account, allocating a free username"""
+    base = email.split('@')[0]
+    for attempt in range(USERNAME_ATTEMPTS):
+        # Each conflict widens the random suffix by a digit: name, name123, name4567, ...
+        username = base if attempt == 0 else f"{base}{random.randint(10 ** (attempt + 1), 10 ** (attempt + 2) - 1)}"
+        row = conn.execute(INSERT_GOOGLE_USER_SQL, (email, username, GOOGLE_PASSWORD_HASH, full_name)).fetchone()
+        if row:
+            return dict(row)
+    raise HTTPException(status_code=409, detail="Could not allocate a username")
+
+class UserCreate(BaseModel):
+    email: EmailStr
+    username: str
+    password: str
+    full_name: Optional[str] = None
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+@router.post("/signup")
+async def signup(user: UserCreate):
+    # scrypt runs on the password pool, off the event loop
+    password_hash = await password_hasher.hash_async(user.password)
+    
+    user_id = await db.run_in_transaction(insert_user, user.email, user.username, password_hash, user.full_name)
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="User already exists")
+    
+    return {"id": user_id, "email": user.email, "message": "User created successfully"}
+
+@router.post("/login")
+async def login(user: UserLogin):
+    db_user = await db.fetch_one("SELECT * FROM users WHERE email = ?", (user.email,))
+
+    # Unknown emails are checked against a dummy hash so both failures take as long
+    valid, new_hash = await password_hasher.verify_and_update_async(
+        user.password, db_user['password_hash'] if db_user else None
+    )
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+
+    # Hashes from older cost settings (or the old placeholder format) are replaced transparently
+    if new_hash:
+        await db.execute_query("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, db_user['id']))
+    
+    return {"message": "Login successful", "user": {"id": db_user['id'], "email": db_user['email'], "username": db_user['username']}}
+
+class GoogleToken(BaseModel):
+    token: str
+
+@router.post("/google")
+async def google_auth(data: GoogleToken):
+    try:
+        # Signing certificates and recently verified tokens are cached; the thread
+        # only matters when the certificates have to be (re)fetched
+        idinfo = await asyncio.to_thread(google_verifier.verify, data.token)
+
+        # ID token is valid. Get the user's Google Account ID from the decoded token.
+        email = idinfo['email']
+        name = idinfo.get('name', '')
+        
+        # Returning users are a single read; new users a single write transaction
+        db_user = await db.fetch_one("SELECT id, email, username, full_name FROM users WHERE email = ?", (email,))
+        
+        if not db_user:
+            db_user = await db.run_in_transaction(insert_google_user, email, name)
+        
+        return {
+            "message": "Google Login successful", 
+            "user": {
+                "id": db_user['id'], 
+                "email": db_user['email'], 
+                "username": db_user['username'],
+                "full_name": db_user.get('full_name')
+            }
+        }
+    except ValueError as e:
+        # Invalid token
+        print(f"Google Auth Error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Invalid Google token: {str(e)}")
+    except CertificatesUnavailable as e:
+        print(f"Google Auth Error: {str(e)}")
+        raise HTTPException(status_code=503, detail="Google sign-in is temporarily unavailable")
@@ -1,47 +1,288 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import date
-from ..db.database import Database
-
-router = APIRouter()
-db = Database()
-
-class TransactionCreate(BaseModel):
-    user_id: int
-    transaction_type: str
-    amount: float
-    category: str
-    description: Optional[str] = None
-    transaction_date: date
-
-@router.get("/{user_id}", response_model=List[dict])
-async def get_transactions(user_id: int):
-    return db.fetch_all("SELECT * FROM transactions WHERE user_id = ? ORDER BY transaction_date DESC", (user_id,))
-
-@router.get("/recent/{user_id}", response_model=List[dict])
-async def get_recent_transactions(user_id: int):
-    return db.fetch_all(
-        "SELECT * FROM transactions WHERE user_id = ? ORDER BY transaction_date DESC LIMIT 5",
-        (user_id,)
-    )
-
-@router.get("/breakdown/{user_id}", response_model=List[dict])
-async def get_spending_breakdown(user_id: int):
-    return db.fetch_all(
-        """SELECT category, SUM(amount) as total 
-           FROM transactions 
-           WHERE user_id = ? AND transaction_type = 'expense' 
-           GROUP BY category""",
-        (user_id,)
-    )
-
-@router.post("/")
-async def create_transaction(transaction: TransactionCreate):
-    transaction_id = db.execute_query(
-        """INSERT INTO transactions (user_id, transaction_type, amount, category, description, transaction_date) 
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (transaction.user_id, transaction.transaction_type, transaction.amount, 
-         transaction.category, transaction.description, transaction.transaction_date)
-    )
-    return {"id": transaction_id, "message": "Transaction created successfully"}
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from datetime import date
+import base64
+import codecs
+import csv
+import json
+import sqlite3
+import time
+from ..db.database import AsyncDatabase
+from ..db import category_totals
+from ..services.financial_context import financial_context
+
+router = APIRouter()
+db = AsyncDatabase()
+
+# Rows fetched per round trip when streaming a full export
+STREAM_CHUNK_SIZE = 500
+
+# Rows validated and written per transaction by the bulk importer
+BULK_BATCH_SIZE = 1000
+# Per-row errors echoed back in a bulk import report
+BULK_MAX_REPORTED_ERRORS = 100
+
+INSERT_TRANSACTION_SQL = """INSERT INTO transactions (user_id, transaction_type, amount, category, description, transaction_date) 
+           VALUES (?, ?, ?, ?, ?, ?)"""
+
+class TransactionCreate(BaseModel):
+    user_id: int
+    transaction_type: str
+    amount: float
+    category: str
+    description: Optional[str] = None
+    transaction_date: date
+
+def encode_cursor(row):
+    raw = json.dumps([str(row['transaction_date']), row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        transaction_date, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(transaction_date), int(transaction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def fetch_page(user_id: int, after, limit: int):
+    # Keyset pagination on (transaction_date, id), newest first
+    if after is None:
+        return await db.fetch_all(
+            """SELECT * FROM transactions WHERE user_id = ?
+               ORDER BY transaction_date DESC, id DESC LIMIT ?""",
+            (user_id, limit)
+        )
+    return await db.fetch_all(
+        """SELECT * FROM transactions WHERE user_id = ? AND (transaction_date, id) < (?, ?)
+           ORDER BY transaction_date DESC, id DESC LIMIT ?""",
+        (user_id, after[0], after[1], limit)
+    )
+
+async def stream_transactions(user_id: int, after, limit: Optional[int]):
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk_size = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+        rows = await fetch_page(user_id, after, chunk_size)
+        if not rows:
+            break
+        yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        if len(rows) < chunk_size:
+            break
+        after = (str(rows[-1]['transaction_date']), rows[-1]['id'])
+        if remaining is not None:
+            remaining -= len(rows)
+
+@router.get("/{user_id}", response_model=List[dict])
+async def get_transactions(
+    user_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+):
+    after = decode_cursor(cursor) if cursor else None
+
+    if stream:
+        return StreamingResponse(stream_transactions(user_id, after, limit), media_type="application/x-ndjson")
+
+    if limit is None and after is None:
+        # Unpaginated request: full history, kept for existing clients
+        return await db.fetch_all("SELECT * FROM transactions WHERE user_id = ? ORDER BY transaction_date DESC, id DESC", (user_id,))
+
+    page_size = limit or 100
+    rows = await fetch_page(user_id, after, page_size + 1)
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    return rows
+
+@router.get("/recent/{user_id}", response_model=List[dict])
+async def get_recent_transactions(user_id: int):
+    return await db.fetch_all(
+        "SELECT * FROM transactions WHERE user_id = ? ORDER BY transaction_date DESC LIMIT 5",
+        (user_id,)
+    )
+
+@router.get("/breakdown/{user_id}", response_model=List[dict])
+async def get_spending_breakdown(user_id: int):
+    return await db.fetch_all(
+        """SELECT category, SUM(total) as total 
+           FROM category_totals 
+           WHERE user_id = ? AND transaction_type = 'expense' 
+           GROUP BY category""",
+        (user_id,)
+    )
+
+def transaction_params(transaction):
+    return (transaction.user_id, transaction.transaction_type, transaction.amount, 
+            transaction.category, transaction.description, transaction.transaction_date)
+
+@router.post("/")
+async def create_transaction(transaction: TransactionCreate):
+    def insert(conn):
+        cursor = conn.execute(INSERT_TRANSACTION_SQL, transaction_params(transaction))
+        category_totals.record_transaction(
+            conn, transaction.user_id, transaction.transaction_type, transaction.amount,
+            transaction.category, transaction.transaction_date
+        )
+        return cursor.lastrowid
+
+    transaction_id = await db.run_in_transaction(insert)
+    financial_context.invalidate(transaction.user_id)
+    return {"id": transaction_id, "message": "Transaction created successfully"}
+
+def insert_batch(conn, batch):
+    """Write a batch of (row_number, TransactionCreate) pairs; returns (inserted, errors)"""
+    summary_rows = [
+        (t.user_id, t.transaction_type, t.amount, t.category, t.transaction_date) for _, t in batch
+    ]
+    conn.execute("SAVEPOINT bulk_batch")
+    try:
+        conn.executemany(INSERT_TRANSACTION_SQL, [transaction_params(t) for _, t in batch])
+        category_totals.record_transactions(conn, summary_rows)
+        conn.execute("RELEASE SAVEPOINT bulk_batch")
+        return len(batch), []
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO SAVEPOINT bulk_batch")
+        conn.execute("RELEASE SAVEPOINT bulk_batch")
+
+    # A constraint failed somewhere in the batch: retry row by row to pin it down
+    inserted, errors = 0, []
+    for (row_number, t), summary_row in zip(batch, summary_rows):
+        try:
+            conn.execute(INSERT_TRANSACTION_SQL, transaction_params(t))
+        except sqlite3.IntegrityError as e:
+            errors.append({"row": row_number, "errors": [str(e)]})
+            continue
+        category_totals.record_transactions(conn, [summary_row])
+        inserted += 1
+    return inserted, errors
+
+async def iter_json_records(request: Request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of transactions")
+    for record in payload:
+        yield record
+
+async def iter_csv_records(chunks):
+    """Parse CSV incrementally from an async iterator of byte chunks"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header = None
+    pending = ""
+    # Lines of a record whose quoted field spans a line break, and their quote count
+    record_lines = []
+    quotes = 0
+
+    def parse(lines):
+        nonlocal header
+        for values in csv.reader(lines):
+            if not values:
+                continue
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            yield {k: (v if v != "" else None) for k, v in zip(header, values)}
+
+    def complete_records(lines):
+        # Only hand the reader whole records: a line ends one when the quotes seen so far pair up
+        nonlocal quotes
+        ready = []
+        for line in lines:
+            record_lines.append(line + "\n")
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                ready.extend(record_lines)
+                record_lines.clear()
+                quotes = 0
+        return ready
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for record in parse(complete_records(lines)):
+            yield record
+
+    pending += decoder.decode(b"", final=True)
+    for record in parse(record_lines + [pending]):
+        yield record
+
+async def iter_upload_chunks(upload, size=64 * 1024):
+    while True:
+        chunk = await upload.read(size)
+        if not chunk:
+            break
+        yield chunk
+
+async def iter_bulk_records(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        return iter_json_records(request)
+    if content_type.startswith("text/csv"):
+        return iter_csv_records(request.stream())
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Expected a CSV upload in the 'file' field")
+        return iter_csv_records(iter_upload_chunks(upload))
+    raise HTTPException(status_code=415, detail="Send a JSON array, text/csv body, or multipart CSV upload")
+
+@router.post("/bulk")
+async def bulk_import_transactions(request: Request):
+    started = time.perf_counter()
+    records = await iter_bulk_records(request)
+
+    inserted, failed = 0, 0
+    errors = []
+    user_ids = set()
+    batch = []
+
+    async def flush():
+        nonlocal inserted, failed
+        batch_inserted, batch_errors = await db.run_in_transaction(insert_batch, list(batch))
+        inserted += batch_inserted
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:BULK_MAX_REPORTED_ERRORS - len(errors)])
+        batch.clear()
+
+    row_number = 0
+    async for record in records:
+        row_number += 1
+        try:
+            if not isinstance(record, dict):
+                raise TypeError("Each transaction must be an object")
+            transaction = TransactionCreate(**record)
+        except (ValidationError, TypeError) as e:
+            failed += 1
+            if len(errors) < BULK_MAX_REPORTED_ERRORS:
+                messages = ([f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+                            if isinstance(e, ValidationError) else [str(e)])
+                errors.append({"row": row_number, "errors": messages})
+            continue
+
+        batch.append((row_number, transaction))
+        user_ids.add(transaction.user_id)
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    for user_id in user_ids:
+        financial_context.invalidate(user_id)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(row_number / elapsed, 1) if elapsed > 0 else None,
+    }
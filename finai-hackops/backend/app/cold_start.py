@@ -0,0 +1,67 @@
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy packages that must not be imported by `import app.main`; the code that
+# needs them imports them on first use or in the app lifespan instead
+DEFERRED_MODULES = (
+    "google.generativeai", "google.auth", "google.oauth2", "pandas", "joblib", "sklearn", "numpy", "uvicorn",
+)
+# Cold import budget for app.main, in milliseconds
+IMPORT_BUDGET_MS = float(os.getenv('FINAI_IMPORT_BUDGET_MS', '1000'))
+
+
+def measure(module="app.main"):
+    """
+    Import module in a fresh interpreter under -X importtime.
+    Returns the cumulative import time in ms and {module name: (self_us, cumulative_us)}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings[module][1] / 1000, timings
+
+
+def check(module="app.main", budget_ms=IMPORT_BUDGET_MS, runs=5, top=15):
+    """Best-of-N cold import time against the budget; returns a list of failures"""
+    measure(module)  # Warm the bytecode cache so compilation isn't counted
+    best_ms, timings = min((measure(module) for _ in range(runs)), key=lambda r: r[0])
+
+    print(f"import {module}: {best_ms:.1f} ms (best of {runs}, budget {budget_ms:.0f} ms)")
+    print("Slowest modules (self time):")
+    for name, (self_us, cumulative_us) in sorted(timings.items(), key=lambda t: -t[1][0])[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if best_ms > budget_ms:
+        failures.append(f"cold import took {best_ms:.1f} ms, over the {budget_ms:.0f} ms budget")
+    eager = [name for name in DEFERRED_MODULES if name in timings]
+    if eager:
+        failures.append("deferred modules imported eagerly: " + ", ".join(eager))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if the API's cold import time regresses")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = check(args.module, args.budget_ms, args.runs)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
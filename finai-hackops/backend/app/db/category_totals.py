@@ -0,0 +1,115 @@
+import sys
+from .database import Database
+
+# Materialized per-user/category/type/month sums of the transactions table.
+# Writers keep it current through record_transaction; rebuild/verify repair drift.
+TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS category_totals (
+    user_id INTEGER NOT NULL,
+    transaction_type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    month TEXT NOT NULL,
+    total REAL NOT NULL DEFAULT 0,
+    abs_total REAL NOT NULL DEFAULT 0,
+    txn_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, transaction_type, category, month)
+) WITHOUT ROWID
+"""
+
+UPSERT_SQL = """
+INSERT INTO category_totals (user_id, transaction_type, category, month, total, abs_total, txn_count)
+VALUES (?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (user_id, transaction_type, category, month) DO UPDATE SET
+    total = total + excluded.total,
+    abs_total = abs_total + excluded.abs_total,
+    txn_count = txn_count + 1
+"""
+
+AGGREGATE_SQL = """
+SELECT user_id, transaction_type, category, substr(transaction_date, 1, 7) AS month,
+       SUM(amount) AS total, SUM(ABS(amount)) AS abs_total, COUNT(*) AS txn_count
+FROM transactions
+GROUP BY user_id, transaction_type, category, month
+"""
+
+
+def month_of(transaction_date):
+    """Bucket key for a transaction date ('YYYY-MM')"""
+    return str(transaction_date)[:7]
+
+
+def record_transaction(conn, user_id, transaction_type, amount, category, transaction_date):
+    """Fold one new transaction into the summary; call inside the inserting transaction"""
+    conn.execute(
+        UPSERT_SQL,
+        (user_id, transaction_type, category, month_of(transaction_date), float(amount), abs(float(amount)))
+    )
+
+
+def record_transactions(conn, rows):
+    """Batch form of record_transaction for (user_id, type, amount, category, date) tuples"""
+    conn.executemany(
+        UPSERT_SQL,
+        [(user_id, transaction_type, category, month_of(transaction_date), float(amount), abs(float(amount)))
+         for user_id, transaction_type, amount, category, transaction_date in rows]
+    )
+
+
+def rebuild(conn):
+    """Recompute the whole summary from the transactions table"""
+    conn.execute(TABLE_SQL)
+    conn.execute("DELETE FROM category_totals")
+    conn.execute(
+        "INSERT INTO category_totals (user_id, transaction_type, category, month, total, abs_total, txn_count) "
+        + AGGREGATE_SQL
+    )
+
+
+def verify(conn, tolerance=1e-6):
+    """Return the summary keys whose stored sums differ from the transactions table"""
+    expected = {
+        (r['user_id'], r['transaction_type'], r['category'], r['month']): r
+        for r in conn.execute(AGGREGATE_SQL)
+    }
+    actual = {
+        (r['user_id'], r['transaction_type'], r['category'], r['month']): r
+        for r in conn.execute("SELECT * FROM category_totals")
+    }
+
+    drift = []
+    for key in expected.keys() | actual.keys():
+        want, have = expected.get(key), actual.get(key)
+        if want is None or have is None:
+            drift.append(key)
+        elif (want['txn_count'] != have['txn_count']
+              or abs(want['total'] - have['total']) > tolerance
+              or abs(want['abs_total'] - have['abs_total']) > tolerance):
+            drift.append(key)
+    return sorted(drift, key=str)
+
+
+def main(argv):
+    command = argv[0] if argv else 'verify'
+    db = Database(argv[1] if len(argv) > 1 else None)
+
+    with db.get_connection() as conn:
+        if command == 'rebuild':
+            rebuild(conn)
+            conn.commit()
+            print("category_totals rebuilt.")
+        elif command == 'verify':
+            drift = verify(conn)
+            if drift:
+                print(f"category_totals has drifted on {len(drift)} key(s):")
+                for key in drift:
+                    print(f"  {key}")
+                return 1
+            print("category_totals is consistent with transactions.")
+        else:
+            print("Usage: python -m app.db.category_totals [rebuild|verify] [db_path]")
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
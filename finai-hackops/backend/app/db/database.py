@@ -1,40 +1,258 @@
-import sqlite3
-import os
-from contextlib import contextmanager
-
-class Database:
-    def __init__(self, db_path=None):
-        if db_path is None:
-            # Default to the db file in the backend root
-            self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'finai_dev.db')
-        else:
-            self.db_path = db_path
-    
-    @contextmanager
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
-    
-    def execute_query(self, query, params=()):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.lastrowid
-    
-    def fetch_all(self, query, params=()):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
-    
-    def fetch_one(self, query, params=()):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            row = cursor.fetchone()
-            return dict(row) if row else None
+import asyncio
+import sqlite3
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Connection pool tuning (overridable through the environment)
+POOL_SIZE = int(os.getenv('FINAI_DB_POOL_SIZE', '8'))
+POOL_TIMEOUT = float(os.getenv('FINAI_DB_POOL_TIMEOUT', '30'))
+
+# PRAGMAs applied to every pooled connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by every Database on the same file"""
+
+    def __init__(self, db_path, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._created = 0
+        self._in_use = 0
+        self._acquired = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # Pool exhausted: block until another thread hands a connection back
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Timed out after {self.timeout}s waiting for a database connection")
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._waits += 1
+            self._wait_time += waited
+            self._max_wait_time = max(self._max_wait_time, waited)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # Nested use on the same thread reuses the connection already checked out
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._checkout()
+        with self._lock:
+            self._in_use += 1
+            self._acquired += 1
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            with self._lock:
+                self._in_use -= 1
+            self._release(conn)
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection: drop it and let the pool create a fresh one
+            with self._lock:
+                self._created -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "total_wait_ms": round(self._wait_time * 1000, 3),
+                "max_wait_ms": round(self._max_wait_time * 1000, 3),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path):
+    """Return the process-wide pool for a database file, creating it on first use"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+class Database:
+    def __init__(self, db_path=None):
+        if db_path is None:
+            # Default to the db file in the backend root
+            self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'finai_dev.db')
+        else:
+            self.db_path = db_path
+        self.pool = get_pool(self.db_path)
+
+    @contextmanager
+    def get_connection(self):
+        with self.pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self):
+        """Connection whose statements commit together, or roll back on error"""
+        with self.get_connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def run_in_transaction(self, func, *args):
+        with self.transaction() as conn:
+            return func(conn, *args)
+
+    def execute_query(self, query, params=()):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            conn.commit()
+            return cursor.lastrowid
+
+    def fetch_all(self, query, params=()):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def fetch_one(self, query, params=()):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def pool_stats(self):
+        """Pool size and wait-time metrics for monitoring"""
+        return self.pool.stats()
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(db_path):
+    """Return the dedicated query executor for a database file, sized to its pool"""
+    key = os.path.abspath(db_path)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="finai-db")
+            _executors[key] = executor
+        return executor
+
+
+class AsyncDatabase:
+    """Awaitable Database: queries run on a dedicated executor so the event loop never blocks"""
+
+    def __init__(self, db_path=None):
+        self.sync = Database(db_path)
+        self.db_path = self.sync.db_path
+        self.executor = get_executor(self.db_path)
+
+    async def run(self, func, *args):
+        """Run a blocking callable on the database executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def run_in_transaction(self, func, *args):
+        """Run func(conn, *args) on the executor inside a single write transaction"""
+        return await self.run(self.sync.run_in_transaction, func, *args)
+
+    async def execute_query(self, query, params=()):
+        return await self.run(self.sync.execute_query, query, params)
+
+    async def fetch_all(self, query, params=()):
+        return await self.run(self.sync.fetch_all, query, params)
+
+    async def fetch_one(self, query, params=()):
+        return await self.run(self.sync.fetch_one, query, params)
+
+    def pool_stats(self):
+        return self.sync.pool_stats()
@@ -0,0 +1,296 @@
+import os
+import sys
+import tempfile
+from .database import Database
+from . import category_totals
+
+# Versioned schema changes, applied in order at startup and by the init scripts.
+# Each runs in its own BEGIN IMMEDIATE transaction, so workers starting together
+# apply it once; append new migrations, never edit applied ones.
+MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        full_name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        transaction_type TEXT CHECK(transaction_type IN ('income', 'expense', 'investment')) NOT NULL,
+        amount DECIMAL(15, 2) NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT,
+        transaction_date DATE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ai_analysis (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        analysis_type TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        ai_response TEXT NOT NULL,
+        model_used TEXT DEFAULT 'gemini-pro',
+        confidence_score DECIMAL(3, 2),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS financial_goals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        goal_name TEXT NOT NULL,
+        target_amount DECIMAL(15, 2) NOT NULL,
+        current_amount DECIMAL(15, 2) DEFAULT 0,
+        deadline DATE,
+        status TEXT CHECK(status IN ('active', 'completed', 'cancelled')) DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS budgets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        budget_amount REAL NOT NULL,
+        spent_amount REAL DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS investments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        asset_name TEXT NOT NULL,
+        asset_type TEXT CHECK(asset_type IN ('stock', 'crypto', 'bond', 'mutual_fund', 'real_estate')) NOT NULL,
+        quantity DECIMAL(15, 6) NOT NULL,
+        purchase_price DECIMAL(15, 2) NOT NULL,
+        current_price DECIMAL(15, 2),
+        purchase_date DATE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        sender TEXT CHECK(sender IN ('user', 'ai')) NOT NULL,
+        session_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+]
+
+# One index per hot query shape; see HOT_QUERIES for the statements they serve
+INDEXES_SQL = [
+    # Newest-first history pages and recent transactions (scanned in reverse for DESC)
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions(user_id, transaction_date, id)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_session_created ON chat_history(session_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_budgets_user_category ON budgets(user_id, category)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_analysis_user ON ai_analysis(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_investments_user ON investments(user_id)",
+]
+
+# Left behind by the old init scripts: prefixes of an index above, or (user_type_category)
+# serving no query since the breakdowns moved to category_totals, yet costing every insert
+REDUNDANT_INDEXES = [
+    "idx_transactions_user", "idx_transactions_date", "idx_chat_session", "idx_budgets_user",
+    "idx_transactions_user_type_category",
+]
+
+
+def _table_exists(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def baseline_schema(conn):
+    """
+    Single schema for databases made by either init script (or neither):
+    init_db.py's users.password becomes password_hash, init_database.py's
+    budget_categories rows move into the budgets table the API uses.
+    """
+    for sql in TABLES_SQL:
+        conn.execute(sql)
+
+    users = _columns(conn, 'users')
+    if 'password_hash' not in users and 'password' in users:
+        conn.execute("ALTER TABLE users RENAME COLUMN password TO password_hash")
+    if 'full_name' not in users:
+        conn.execute("ALTER TABLE users ADD COLUMN full_name TEXT")
+
+    if _table_exists(conn, 'budget_categories'):
+        conn.execute(
+            """INSERT INTO budgets (user_id, category, budget_amount, spent_amount)
+               SELECT user_id, category_name, monthly_limit, current_spent FROM budget_categories bc
+               WHERE NOT EXISTS (
+                   SELECT 1 FROM budgets b WHERE b.user_id = bc.user_id AND b.category = bc.category_name
+               )"""
+        )
+        conn.execute("DROP TABLE budget_categories")
+
+    # Summary table, backfilled from any existing transactions
+    if not _table_exists(conn, 'category_totals'):
+        category_totals.rebuild(conn)
+
+
+def hot_query_indexes(conn):
+    for sql in INDEXES_SQL:
+        conn.execute(sql)
+    for name in REDUNDANT_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+MIGRATIONS = [
+    (1, "baseline_schema", baseline_schema),
+    (2, "hot_query_indexes", hot_query_indexes),
+]
+
+
+def applied_versions(conn):
+    conn.execute(MIGRATIONS_TABLE_SQL)
+    conn.commit()
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def migrate(db=None):
+    """Apply pending migrations; returns the (version, name) pairs applied"""
+    db = db or Database()
+    applied = []
+    with db.get_connection() as conn:
+        if applied_versions(conn) >= {version for version, _, _ in MIGRATIONS}:
+            return applied
+        for version, name, apply in MIGRATIONS:
+            # Take the write lock first, then re-check: another worker may have just applied it
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone():
+                    conn.rollback()
+                    continue
+                apply(conn)
+                conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append((version, name))
+    return applied
+
+
+# The API's queries, with the plan each must get: every table access is an index
+# search, and only the flagged ones may sort, because they sort a range the index
+# already bounded (one session's N-turn window, one user's summary rows).
+# Keep in sync when adding or changing a route's SQL.
+HOT_QUERIES = [
+    ("transactions page", """SELECT * FROM transactions WHERE user_id = ?
+        ORDER BY transaction_date DESC, id DESC LIMIT ?""", (1, 100), False),
+    ("transactions keyset page", """SELECT * FROM transactions WHERE user_id = ? AND (transaction_date, id) < (?, ?)
+        ORDER BY transaction_date DESC, id DESC LIMIT ?""", (1, '2024-01-01', 10, 100), False),
+    ("transactions full history", """SELECT * FROM transactions WHERE user_id = ?
+        ORDER BY transaction_date DESC, id DESC""", (1,), False),
+    ("recent transactions", """SELECT * FROM transactions WHERE user_id = ?
+        ORDER BY transaction_date DESC LIMIT 5""", (1,), False),
+    ("spending breakdown", """SELECT category, SUM(total) as total FROM category_totals
+        WHERE user_id = ? AND transaction_type = 'expense' GROUP BY category""", (1,), False),
+    ("category totals upsert", category_totals.UPSERT_SQL, (1, 'expense', 'Food', '2024-01', 1.0, 1.0), False),
+    ("financial context", """SELECT transaction_type, category, SUM(total) AS total, SUM(abs_total) AS abs_total
+        FROM category_totals WHERE user_id = ? GROUP BY transaction_type, category""", (1,), False),
+    ("analysis totals", """SELECT category, SUM(total) as total FROM category_totals
+        WHERE user_id = ? GROUP BY category""", (1,), True),
+    ("budgets with spending", """SELECT b.id, b.user_id, b.category, b.budget_amount, COALESCE(s.total, 0) AS spent_amount
+        FROM budgets b
+        LEFT JOIN (
+            SELECT category, SUM(abs_total) AS total FROM category_totals
+            WHERE user_id = ? AND transaction_type = 'expense' GROUP BY category
+        ) s ON s.category = b.category
+        WHERE b.user_id = ?""", (1, 1), False),
+    ("budget lookup", "SELECT id FROM budgets WHERE user_id = ? AND category = ?", (1, 'Food'), False),
+    ("chat session window", """SELECT sender, message FROM (
+            SELECT id, sender, message, created_at FROM chat_history
+            WHERE session_id = ? AND user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?
+        ) ORDER BY created_at, id""", ('s', 1, 20), True),
+    ("login", "SELECT * FROM users WHERE email = ?", ('a@example.com',), False),
+    ("google login", "SELECT id, email, username, full_name FROM users WHERE email = ?", ('a@example.com',), False),
+    ("retrain ingest", """SELECT id, user_id, transaction_type, amount, category, transaction_date
+        FROM transactions WHERE id > ? ORDER BY id LIMIT ?""", (0, 5000), False),
+]
+
+
+def check_query_plans(db):
+    """EXPLAIN QUERY PLAN every hot query; returns a list of (label, offending plan step)"""
+    problems = []
+    with db.get_connection() as conn:
+        for label, sql, params, allow_sort in HOT_QUERIES:
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+                detail = row[3]
+                full_scan = detail.startswith("SCAN ") and not detail.startswith("SCAN (subquery")
+                sort = detail.startswith("USE TEMP B-TREE") and not allow_sort
+                if full_scan or sort:
+                    problems.append((label, detail))
+    return problems
+
+
+def main(argv):
+    command = argv[0] if argv else 'migrate'
+
+    if command == 'check':
+        # Plans are checked on a freshly migrated database unless one is given
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(argv[1] if len(argv) > 1 else os.path.join(tmp, 'plan_check.db'))
+            migrate(db)
+            problems = check_query_plans(db)
+            db.pool.close()
+        for label, detail in problems:
+            print(f"  {label}: {detail}")
+        if problems:
+            print(f"{len(problems)} query plan step(s) are not index-backed.")
+            return 1
+        print(f"All {len(HOT_QUERIES)} hot queries are index-backed.")
+        return 0
+
+    db = Database(argv[1] if len(argv) > 1 else None)
+    if command == 'migrate':
+        applied = migrate(db)
+        for version, name in applied:
+            print(f"Applied migration {version}: {name}")
+        print("Schema is up to date." if not applied else f"Applied {len(applied)} migration(s).")
+    elif command == 'status':
+        with db.get_connection() as conn:
+            done = applied_versions(conn)
+        for version, name, _ in MIGRATIONS:
+            print(f"  [{'x' if version in done else ' '}] {version}: {name}")
+    else:
+        print("Usage: python -m app.db.migrations [migrate|status|check] [db_path]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from .database import Database
+
+# A batch is written once this many rows are waiting or the oldest has waited this long
+WRITE_BATCH_SIZE = int(os.getenv('FINAI_WRITE_BATCH_SIZE', '200'))
+WRITE_FLUSH_INTERVAL = float(os.getenv('FINAI_WRITE_FLUSH_INTERVAL', '0.5'))
+# Rows held while the database is unavailable; beyond this the oldest are dropped
+WRITE_MAX_PENDING = int(os.getenv('FINAI_WRITE_MAX_PENDING', '10000'))
+
+
+class WriteBehindQueue:
+    """
+    Buffers audit inserts (chat history, AI analyses) off the request path and writes
+    them from a background thread in one transaction per batch. Rows from a batch that
+    hits a locked database are requeued; rows that violate a constraint are dropped.
+    """
+
+    def __init__(self, db=None, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL,
+                 max_pending=WRITE_MAX_PENDING):
+        self.db = db or Database()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_flush_ms = None
+
+    def enqueue(self, sql, params):
+        """Queue one INSERT; returns immediately"""
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._pending.append((sql, tuple(params), time.monotonic()))
+                self.enqueued += 1
+                self._trim()
+                self.max_depth = max(self.max_depth, len(self._pending))
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="finai-write-behind", daemon=True)
+                    self._thread.start()
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify()
+        if closed:
+            # Late writes after shutdown go straight to the database
+            self.db.execute_query(sql, params)
+            with self._cond:
+                self.written += 1
+
+    def _trim(self):
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._pending:
+                        wait = self._pending[0][2] + self.flush_interval - time.monotonic()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                closed = self._closed
+            if closed:
+                return
+            try:
+                flushed = self.flush()
+            except Exception as e:
+                # Keep the flusher alive; enqueue() never restarts it
+                print(f"WARNING: Write-behind flusher error: {e}")
+                flushed = False
+            if not flushed:
+                # Back off instead of spinning on a database that stays locked
+                with self._cond:
+                    self._cond.wait(self.flush_interval)
+
+    def flush(self):
+        """Write everything queued so far; returns True unless the batch had to be requeued"""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._pending)
+                self._pending.clear()
+            if not batch:
+                return True
+
+            started = time.perf_counter()
+            grouped = {}
+            for sql, params, _ in batch:
+                grouped.setdefault(sql, []).append(params)
+            try:
+                try:
+                    with self.db.transaction() as conn:
+                        for sql, rows in grouped.items():
+                            conn.executemany(sql, rows)
+                    written = len(batch)
+                except sqlite3.IntegrityError:
+                    # The row-by-row retry can fail too (e.g. locked); that requeues like any other error
+                    written = self._write_rows(batch)
+            except Exception as e:
+                print(f"WARNING: Write-behind flush of {len(batch)} rows failed, will retry: {e}")
+                with self._cond:
+                    self._pending.extendleft(reversed(batch))
+                    self._trim()
+                    self.failures += 1
+                return False
+
+            with self._cond:
+                self.written += written
+                self.dropped += len(batch) - written
+                self.batches += 1
+                self.last_flush_ms = round((time.perf_counter() - started) * 1000, 3)
+            return True
+
+    def _write_rows(self, batch):
+        """Row-by-row fallback so one bad row doesn't sink the whole batch"""
+        written = 0
+        with self.db.transaction() as conn:
+            for sql, params, _ in batch:
+                try:
+                    conn.execute(sql, params)
+                    written += 1
+                except sqlite3.IntegrityError as e:
+                    print(f"WARNING: Dropped write-behind row: {e}")
+        return written
+
+    def close(self):
+        """Stop the flusher and write whatever is still queued"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def depth(self):
+        return len(self._pending)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": len(self._pending),
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "batch_size": self.batch_size,
+                "flush_interval_s": self.flush_interval,
+                "last_flush_ms": self.last_flush_ms,
+            }
+
+
+write_behind = WriteBehindQueue()
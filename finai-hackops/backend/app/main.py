@@ -1,33 +1,81 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-import os
-from dotenv import load_dotenv
-
-from .api import auth, transactions, analysis, budgets
-
-load_dotenv()
-
-app = FastAPI(title="FinAI API", description="Local backend for FinAI Hackops")
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # For development, allow all. In production, restrict this.
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include Routers
-app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(transactions.router, prefix="/api/transactions", tags=["Transactions"])
-app.include_router(analysis.router, prefix="/api/analysis", tags=["AI Analysis"])
-app.include_router(budgets.router, prefix="/api/budgets", tags=["Budgets"])
-
-@app.get("/")
-async def root():
-    return {"message": "Welcome to FinAI API", "status": "online"}
-
-if __name__ == "__main__":
-    uvicorn.run("backend.app.main:app", host="0.0.0.0", port=8000, reload=True)
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi.middleware.cors import CORSMiddleware
+import os
+from dotenv import load_dotenv
+
+from .api import auth, transactions, analysis, budgets
+from .db.database import Database
+from .db import migrations
+from .db.write_behind import write_behind
+from .services import chat_history, google_tokens, passwords
+from .services.gemini_service import GeminiFinancialAssistant
+
+load_dotenv()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring any existing database up to the current schema and indexes
+    for version, name in migrations.migrate(Database()):
+        print(f"INFO: Applied schema migration {version} ({name}).")
+
+    # Process-wide singletons live on app.state rather than being built at import
+    app.state.gemini = GeminiFinancialAssistant()
+
+    # Load the salary plan model before serving, off the event loop: a request that found
+    # it still loading would block the loop on the registry lock. Then watch for retrained artifacts.
+    from .ai import predict
+    await asyncio.to_thread(predict.registry.refresh)
+    watcher = asyncio.create_task(watch_model(predict.registry, predict.MODEL_RELOAD_INTERVAL))
+    yield
+    watcher.cancel()
+    # Write queued chat history and analyses before the process exits
+    await asyncio.to_thread(write_behind.close)
+
+async def watch_model(registry, interval):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(registry.refresh)
+
+app = FastAPI(title="FinAI API", description="Local backend for FinAI Hackops", lifespan=lifespan)
+
+# Configure CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # For development, allow all. In production, restrict this.
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    # Paged transaction listings return the next-page cursor in this header
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Include Routers
+app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+app.include_router(transactions.router, prefix="/api/transactions", tags=["Transactions"])
+app.include_router(analysis.router, prefix="/api/analysis", tags=["AI Analysis"])
+app.include_router(budgets.router, prefix="/api/budgets", tags=["Budgets"])
+
+@app.get("/")
+async def root():
+    return {"message": "Welcome to FinAI API", "status": "online"}
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    from .ai import predict
+    gemini = request.app.state.gemini
+    return {
+        "db_pool": Database().pool_stats(),
+        "write_behind": write_behind.stats(),
+        "chat_history": chat_history.chat_history.stats(),
+        "google_auth": google_tokens.google_verifier.stats(),
+        "passwords": passwords.password_hasher.stats(),
+        "salary_model": predict.registry.info(),
+        "llm_cache": gemini.cache.stats(),
+        "llm_client": gemini.client.stats() if gemini.client else None,
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("backend.app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,88 @@
+import os
+from collections import OrderedDict, deque
+from ..db.database import AsyncDatabase
+
+# Turns kept per session, sessions kept in memory, and the prompt space given to history
+HISTORY_TURNS = int(os.getenv('FINAI_CHAT_HISTORY_TURNS', '20'))
+HISTORY_MAX_SESSIONS = int(os.getenv('FINAI_CHAT_HISTORY_MAX_SESSIONS', '5000'))
+CONTEXT_TOKEN_BUDGET = int(os.getenv('FINAI_CHAT_CONTEXT_TOKENS', '1000'))
+
+SPEAKERS = {'user': 'User', 'ai': 'Assistant'}
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), enough for budgeting prompt space"""
+    return len(text) // 4 + 1
+
+
+class ChatHistory:
+    """
+    Recent turns per chat session. Each session is loaded once through the
+    (session_id, created_at) index into a bounded ring buffer, which new turns
+    are appended to, so later requests don't touch the database.
+    """
+
+    def __init__(self, db=None, max_turns=HISTORY_TURNS, max_sessions=HISTORY_MAX_SESSIONS,
+                 token_budget=CONTEXT_TOKEN_BUDGET):
+        self.db = db or AsyncDatabase()
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self._sessions = OrderedDict()
+        self.loads = 0
+
+    async def recent(self, user_id, session_id):
+        """The session's last max_turns turns as (sender, message) pairs, oldest first"""
+        key = (user_id, session_id)
+        turns = self._sessions.get(key)
+        if turns is None:
+            turns = deque(await self.load(user_id, session_id), maxlen=self.max_turns)
+            self._sessions[key] = turns
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(key)
+        return list(turns)
+
+    async def load(self, user_id, session_id):
+        self.loads += 1
+        rows = await self.db.fetch_all(
+            """SELECT sender, message FROM (
+                   SELECT id, sender, message, created_at FROM chat_history
+                   WHERE session_id = ? AND user_id = ?
+                   ORDER BY created_at DESC, id DESC
+                   LIMIT ?
+               ) ORDER BY created_at, id""",
+            (session_id, user_id, self.max_turns)
+        )
+        return [(row['sender'], row['message']) for row in rows]
+
+    def append(self, user_id, session_id, sender, message):
+        """Record a new turn; sessions not in memory pick it up from the database on next load"""
+        turns = self._sessions.get((user_id, session_id))
+        if turns is not None:
+            turns.append((sender, message))
+
+    async def context(self, user_id, session_id, token_budget=None):
+        """Transcript of the newest turns that fit within the token budget, oldest first"""
+        budget = self.token_budget if token_budget is None else token_budget
+        lines = []
+        for sender, message in reversed(await self.recent(user_id, session_id)):
+            line = f"{SPEAKERS.get(sender, sender)}: {message}"
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            budget -= cost
+            lines.append(line)
+        return "\n".join(reversed(lines))
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "max_turns": self.max_turns,
+            "token_budget": self.token_budget,
+            "loads": self.loads,
+        }
+
+
+chat_history = ChatHistory()
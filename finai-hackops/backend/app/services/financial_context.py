@@ -0,0 +1,69 @@
+import itertools
+import os
+import time
+from collections import OrderedDict
+from ..db.database import AsyncDatabase
+
+CONTEXT_TTL = float(os.getenv('FINAI_CONTEXT_TTL', '300'))
+CONTEXT_MAX_USERS = int(os.getenv('FINAI_CONTEXT_MAX_USERS', '10000'))
+
+
+class FinancialContext:
+    """Per-user income/expense summary for the assistant, cached between chat turns"""
+
+    def __init__(self, db=None, ttl=CONTEXT_TTL, max_users=CONTEXT_MAX_USERS):
+        self.db = db or AsyncDatabase()
+        self.ttl = ttl
+        self.max_users = max_users
+        self._cache = OrderedDict()
+        # Bumped by invalidate(); a load that raced a write must not cache its stale result
+        self._generations = OrderedDict()
+        self._counter = itertools.count(1)
+
+    async def get(self, user_id):
+        """Return {"income": float, "expenses": {category: amount}} for a user"""
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(user_id)
+            return entry[1]
+
+        generation = self._generations.get(user_id)
+        data = await self.load(user_id)
+        if self._generations.get(user_id) != generation:
+            return data
+        self._cache[user_id] = (time.monotonic() + self.ttl, data)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_users:
+            self._cache.popitem(last=False)
+        return data
+
+    async def load(self, user_id):
+        """Aggregate the user's totals in SQL; work is bounded by category count, not history"""
+        rows = await self.db.fetch_all(
+            """SELECT transaction_type, category, SUM(total) AS total, SUM(abs_total) AS abs_total
+               FROM category_totals
+               WHERE user_id = ?
+               GROUP BY transaction_type, category""",
+            (user_id,)
+        )
+
+        income = 0
+        expenses = {}
+        for row in rows:
+            if row['transaction_type'] == 'income':
+                income += row['total']
+            else:
+                expenses[row['category']] = expenses.get(row['category'], 0) + row['abs_total']
+
+        return {"income": income, "expenses": expenses}
+
+    def invalidate(self, user_id):
+        """Drop a user's cached summary after their transactions change"""
+        self._cache.pop(user_id, None)
+        self._generations[user_id] = next(self._counter)
+        self._generations.move_to_end(user_id)
+        while len(self._generations) > self.max_users:
+            self._generations.popitem(last=False)
+
+
+financial_context = FinancialContext()
@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
-from ..ai.predict import get_salary_plan
+from .llm_cache import ResponseCache
+from .intents import fallback_classifier, routing_classifier
+from .llm_client import AsyncLLMClient, LLMUnavailable
 
 load_dotenv()
 
@@ -9,8 +11,14 @@ class GeminiFinancialAssistant:
         # Gemini is kept as an optional secondary service
         api_key = os.getenv('GEMINI_API_KEY')
         self.model = None
-        
-        if api_key and api_key != "your_gemini_api_key_here":
+        # Identical prompts (e.g. unchanged category totals) are answered from cache
+        self.cache = ResponseCache(namespace='gemini-pro')
+        
+        if os.getenv('FINAI_LLM_BACKEND') == 'stub':
+            from .llm_stub import StubModel
+            self.model = StubModel()
+            print("INFO: Using the local stub LLM backend.")
+        elif api_key and api_key != "your_gemini_api_key_here":
             try:
                 import google.generativeai as genai
                 genai.configure(api_key=api_key)
@@ -22,8 +30,20 @@ class GeminiFinancialAssistant:
                 self.model = None
         else:
             print("INFO: Gemini API key not found or default. Using local models where available.")
-        
-    def analyze_spending(self, transactions_data):
+
+        # Timeouts, concurrency cap, retries and circuit breaker around remote calls
+        self.client = AsyncLLMClient(self.model) if self.model else None
+
+    async def _generate(self, method, prompt):
+        """Call Gemini without blocking the event loop, serving repeated prompts from the response cache"""
+        cached = await self.cache.get_async(prompt)
+        if cached is not None:
+            return cached
+        text = await self.client.generate(method, prompt)
+        await self.cache.set_async(prompt, text)
+        return text
+        
+    async def analyze_spending(self, transactions_data):
         """Analyze spending patterns with local fallback"""
         if not self.model: 
             return "Local Mode: I've analyzed your categories. You're doing well! Visit the Budget page for a deeper ML-based analysis."
@@ -43,13 +63,12 @@ class GeminiFinancialAssistant:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
+            return await self._generate("analyze_spending", prompt)
+        except LLMUnavailable as e:
             print(f"Error calling Gemini for spending analysis: {e}")
             return "Local Mode: I've reviewed your spending. Tip: Categorize your transactions clearly to get better insights on the Budget dashboard!"
 
-    def investment_advice(self, portfolio_data, risk_tolerance):
+    async def investment_advice(self, portfolio_data, risk_tolerance):
         """Get investment recommendations with local fallback"""
         if not self.model: 
             return "Local Mode: Diversification is key! Consider a mix of index funds. Check our Savings tab for goal tracking."
@@ -69,9 +88,8 @@ class GeminiFinancialAssistant:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
+            return await self._generate("investment_advice", prompt)
+        except LLMUnavailable as e:
             print(f"Error calling Gemini for investment advice: {e}")
             return "Local Mode: Start with an emergency fund of 3-6 months. Then look at low-cost index funds for long-term growth."
     
@@ -93,10 +111,12 @@ class GeminiFinancialAssistant:
             except:
                 pass
 
+        # Deferred so importing the service doesn't pull in numpy and the model code
+        from ..ai.predict import get_salary_plan
         result = get_salary_plan(income, expenses_dict)
         return result['advice']
     
-    def chat_assistant(self, user_message, context="", financial_data=None):
+    async def chat_assistant(self, user_message, context="", financial_data=None):
         """Intelligent financial chat router"""
         # 1. Detect Intent
         intent = self._detect_intent(user_message)
@@ -109,26 +129,56 @@ class GeminiFinancialAssistant:
             
         # 3. Fallback to LLM if available, else local general chat
         if self.model:
-            system_prompt = """You are a helpful financial AI assistant. 
-            Provide accurate, helpful financial advice while being clear that 
-            you're an AI and users should consult professionals for major decisions."""
-            full_prompt = f"{system_prompt}\n\nContext: {context}\nFinancial Data: {financial_data}\n\nUser: {user_message}"
+            full_prompt = self._chat_prompt(user_message, context, financial_data)
             try:
-                response = self.model.generate_content(full_prompt)
-                return response.text
-            except Exception as e:
+                return await self._generate("chat_assistant", full_prompt)
+            except LLMUnavailable as e:
                 print(f"Error calling Gemini: {e}")
         
         return self._local_chat_fallback(user_message)
 
+    async def chat_assistant_stream(self, user_message, context="", financial_data=None):
+        """Streaming chat_assistant: yields response chunks as soon as they are available"""
+        intent = self._detect_intent(user_message)
+        if intent == "SALARY_PLAN":
+            yield self._handle_salary_plan_intent(financial_data)
+            return
+        if intent == "EXPENSE_ANALYSIS":
+            yield self._handle_expense_intent(financial_data)
+            return
+
+        if self.model:
+            full_prompt = self._chat_prompt(user_message, context, financial_data)
+            cached = await self.cache.get_async(full_prompt)
+            if cached is not None:
+                yield cached
+                return
+
+            chunks = []
+            try:
+                async for chunk in self.client.stream("chat_assistant_stream", full_prompt):
+                    chunks.append(chunk)
+                    yield chunk
+            except LLMUnavailable as e:
+                print(f"Error streaming from Gemini: {e}")
+                if chunks:
+                    # Part of the answer is already with the client; end the stream there
+                    return
+            else:
+                await self.cache.set_async(full_prompt, "".join(chunks))
+                return
+
+        yield self._local_chat_fallback(user_message)
+
+    def _chat_prompt(self, user_message, context, financial_data):
+        system_prompt = """You are a helpful financial AI assistant. 
+        Provide accurate, helpful financial advice while being clear that 
+        you're an AI and users should consult professionals for major decisions."""
+        return f"{system_prompt}\n\nContext: {context}\nFinancial Data: {financial_data}\n\nUser: {user_message}"
+
     def _detect_intent(self, message):
         """Identify what the user wants to do"""
-        msg = message.lower()
-        if any(w in msg for w in ["salary", "plan", "recommendation", "advice", "budget plan"]):
-            return "SALARY_PLAN"
-        if any(w in msg for w in ["spend", "expense", "cost", "breakdown", "analysis"]):
-            return "EXPENSE_ANALYSIS"
-        return "GENERAL"
+        return routing_classifier.classify(message)
 
     def _handle_salary_plan_intent(self, financial_data):
         """Route to local ML model for specific planning"""
@@ -138,6 +188,7 @@ class GeminiFinancialAssistant:
         income = financial_data.get('income', 0)
         expenses = financial_data.get('expenses', {})
         
+        from ..ai.predict import get_salary_plan
         prediction = get_salary_plan(income, expenses)
         
         # Structure the response as a professional "Plan"
@@ -166,14 +217,14 @@ class GeminiFinancialAssistant:
 
     def _local_chat_fallback(self, message):
         """Intelligent local fallback for chat that uses financial context"""
-        message = message.lower()
-        
+        intent = fallback_classifier.classify(message)
+
         # Greeting
-        if any(word in message for word in ["hello", "hi", "hey", "hola"]):
+        if intent == "GREETING":
             return "Hello! I'm FinPilot, your local AI financial assistant. I'm currently running in local mode to protect your data. How can I help you with your finances today?"
         
         # Salary/Planning Intent - Use ML Model
-        if any(word in message for word in ["salary", "plan", "recommend", "advice", "budget"]):
+        if intent == "PLANNING":
             # Try to give general ML-based advice if we have enough context
             # For now, point them to the detailed budget page which uses the model properly
             return ("Since I'm in local mode, I recommend checking out the 'Budget Management' page. "
@@ -181,12 +232,12 @@ class GeminiFinancialAssistant:
                     "income and expenses to give you precise saving recommendations!")
 
         # Savings Intent
-        if "save" in message or "savings" in message:
+        if intent == "SAVINGS":
             return ("Saving is key to financial freedom! A good rule of thumb is the 50/30/20 rule: "
                     "50% for needs, 30% for wants, and 20% for savings. You can track your goals in the 'Savings' tab.")
 
         # Investment Intent
-        if "invest" in message or "stock" in message:
+        if intent == "INVESTMENT":
             return ("Investing is a great way to build wealth. Since I'm in local mode, I recommend "
                     "starting with low-cost index funds or ETFs. Always ensure you have an emergency fund "
                     "of 3-6 months of expenses before investing heavily.")
@@ -0,0 +1,316 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+GOOGLE_CLIENT_ID = os.getenv(
+    'GOOGLE_CLIENT_ID', "743696234738-4s6o73beo374rbc7polnpgk38hshfi77.apps.googleusercontent.com"
+)
+# Google's signing certificates; point at a local stand-in for offline testing
+GOOGLE_CERTS_URL = os.getenv('FINAI_GOOGLE_CERTS_URL', "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+CLOCK_SKEW_SECONDS = 10
+
+# Used when a certificate response carries no Cache-Control max-age
+CERTS_DEFAULT_TTL = float(os.getenv('FINAI_GOOGLE_CERTS_TTL', '300'))
+CERTS_TIMEOUT = float(os.getenv('FINAI_GOOGLE_CERTS_TIMEOUT', '10'))
+# An unknown key id forces a refetch (keys rotated early), at most this often
+CERTS_MIN_REFRESH = 60
+# How long a verified token is trusted without re-checking its signature
+VERIFIED_TOKEN_TTL = float(os.getenv('FINAI_GOOGLE_TOKEN_CACHE_TTL', '60'))
+VERIFIED_TOKEN_MAX = 10000
+
+
+class CertificatesUnavailable(Exception):
+    """Google's signing certificates could not be fetched and none are cached"""
+
+
+_max_age = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+def cache_lifetime(headers, default=CERTS_DEFAULT_TTL):
+    """Seconds a response may be reused, from its Cache-Control and Age headers"""
+    headers = {k.lower(): v for k, v in headers.items()}
+    cache_control = headers.get('cache-control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = _max_age.search(cache_control)
+    if not match:
+        return default
+    try:
+        age = int(headers.get('age', 0))
+    except ValueError:
+        age = 0
+    return max(0, int(match.group(1)) - age)
+
+
+def token_key_id(token):
+    """The unverified 'kid' header of a JWT, or None"""
+    try:
+        header = token.split(".", 1)[0]
+        return json.loads(base64.urlsafe_b64decode(header + "=" * (-len(header) % 4))).get("kid")
+    except (ValueError, AttributeError):
+        return None
+
+
+class CachingRequest:
+    """
+    google-auth transport that reuses one pooled requests.Session and serves GETs
+    from memory until their Cache-Control lifetime runs out. Expired entries are
+    still served if a refetch fails.
+    """
+
+    def __init__(self, session=None, timeout=CERTS_TIMEOUT, default_ttl=CERTS_DEFAULT_TTL):
+        self._session = session
+        self._transport = None
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self.fetches = 0
+        self.hits = 0
+        self.stale_hits = 0
+
+    def _get_transport(self):
+        if self._transport is None:
+            import requests
+            from google.auth.transport.requests import Request
+            self._transport = Request(session=self._session or requests.Session())
+        return self._transport
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET":
+            return self._get_transport()(url, method=method, body=body, headers=headers,
+                                         timeout=timeout or self.timeout, **kwargs)
+
+        response = self._fresh(url)
+        if response is not None:
+            return response
+
+        # One fetch per URL at a time; concurrent callers reuse its result
+        with self._fetch_lock:
+            response = self._fresh(url)
+            if response is not None:
+                return response
+            try:
+                response = self._get_transport()(url, method="GET", headers=headers,
+                                                 timeout=timeout or self.timeout, **kwargs)
+                ok = response.status == 200
+            except Exception:
+                response, ok = None, False
+            with self._lock:
+                self.fetches += 1
+                if ok:
+                    self._entries[url] = (time.monotonic() + cache_lifetime(response.headers, self.default_ttl),
+                                          response)
+                    return response
+                stale = self._entries.get(url)
+                if stale is not None:
+                    self.stale_hits += 1
+                    return stale[1]
+        if response is None:
+            from google.auth import exceptions
+            raise exceptions.TransportError(f"Could not fetch {url}")
+        return response
+
+    def _fresh(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def cached_data(self, url):
+        """Body of the cached response for url, fresh or not"""
+        with self._lock:
+            entry = self._entries.get(url)
+            return entry[1].data if entry is not None else None
+
+    def invalidate(self, url):
+        """Treat the cached response as expired; it is kept as a fallback until refetched"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries[url] = (0, entry[1])
+
+
+class GoogleTokenVerifier:
+    """
+    Verifies Google ID tokens against cached signing certificates, and remembers
+    recently verified tokens (by hash) so a repeated token skips the signature check.
+    """
+
+    def __init__(self, client_id=GOOGLE_CLIENT_ID, certs_url=GOOGLE_CERTS_URL, request=None,
+                 token_ttl=VERIFIED_TOKEN_TTL, max_tokens=VERIFIED_TOKEN_MAX):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.request = request or CachingRequest()
+        self.token_ttl = token_ttl
+        self.max_tokens = max_tokens
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_forced_refresh = float('-inf')
+        self.verifications = 0
+        self.token_hits = 0
+        self.forced_refreshes = 0
+
+    def verify(self, token):
+        """Claims of a valid token; raises ValueError for invalid or expired tokens and
+        CertificatesUnavailable when the keys to check it against can't be fetched"""
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._verified.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._verified.move_to_end(key)
+                    self.token_hits += 1
+                    return entry[1]
+                del self._verified[key]
+
+        self._refresh_for_unknown_key(token_key_id(token))
+
+        from google.auth import exceptions
+        from google.oauth2 import id_token
+        try:
+            claims = id_token.verify_token(
+                token, self.request, self.client_id, certs_url=self.certs_url,
+                clock_skew_in_seconds=CLOCK_SKEW_SECONDS
+            )
+        except exceptions.TransportError as e:
+            raise CertificatesUnavailable(str(e)) from e
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+
+        with self._lock:
+            self.verifications += 1
+            self._verified[key] = (min(now + self.token_ttl, claims.get("exp", now)), claims)
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.max_tokens:
+                self._verified.popitem(last=False)
+        return claims
+
+    def _refresh_for_unknown_key(self, kid):
+        data = self.request.cached_data(self.certs_url)
+        if not kid or data is None:
+            return
+        certs = json.loads(data)
+        known = {k.get("kid") for k in certs["keys"]} if "keys" in certs else set(certs)
+        if kid in known or time.monotonic() - self._last_forced_refresh < CERTS_MIN_REFRESH:
+            return
+        self._last_forced_refresh = time.monotonic()
+        self.forced_refreshes += 1
+        self.request.invalidate(self.certs_url)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cert_fetches": self.request.fetches,
+                "cert_cache_hits": self.request.hits,
+                "cert_stale_hits": self.request.stale_hits,
+                "forced_refreshes": self.forced_refreshes,
+                "verifications": self.verifications,
+                "token_cache_hits": self.token_hits,
+                "cached_tokens": len(self._verified),
+            }
+
+
+google_verifier = GoogleTokenVerifier()
+
+
+def _serve_stand_in(document, max_age=3600):
+    """Local HTTP server publishing a certificate document, like Google's certs endpoint"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        hits = 0
+
+        def do_GET(self):
+            Handler.hits += 1
+            body = json.dumps(document).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", f"public, max-age={max_age}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Handler
+
+
+def _signing_key(kid):
+    """RSA signer plus the self-signed PEM certificate a certs endpoint would publish for it"""
+    import datetime
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    from google.auth import crypt
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "finai-stand-in")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+            .public_key(private_key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(private_key, hashes.SHA256()))
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    signer = crypt.RSASigner.from_string(private_pem, key_id=kid)
+    return signer, cert.public_bytes(serialization.Encoding.PEM).decode("ascii")
+
+
+def benchmark(logins=200):
+    """Verify tokens against a local certs stand-in; shows cold, warm and repeated-token latency"""
+    from google.auth import jwt
+
+    signer, cert = _signing_key("key-1")
+    document = {"key-1": cert}
+    server, handler = _serve_stand_in(document)
+    verifier = GoogleTokenVerifier(client_id="finai-test", certs_url=f"http://127.0.0.1:{server.server_port}/certs")
+
+    def make_token(i, key=signer):
+        now = int(time.time())
+        payload = {"iss": "https://accounts.google.com", "aud": "finai-test", "sub": str(i),
+                   "email": f"user{i}@example.com", "iat": now, "exp": now + 3600}
+        return jwt.encode(key, payload).decode("ascii")
+
+    tokens = [make_token(i) for i in range(logins)]
+    timings = {}
+    started = time.perf_counter()
+    verifier.verify(tokens[0])
+    timings["cold (cert fetch)"] = time.perf_counter() - started
+    started = time.perf_counter()
+    for token in tokens[1:]:
+        verifier.verify(token)
+    timings["warm (cached certs)"] = (time.perf_counter() - started) / (logins - 1)
+    started = time.perf_counter()
+    for token in tokens:
+        verifier.verify(token)
+    timings["repeated token"] = (time.perf_counter() - started) / logins
+
+    # Key rotation: a token signed by a key the cached document doesn't list forces one refetch
+    rotated, rotated_cert = _signing_key("key-2")
+    document["key-2"] = rotated_cert
+    verifier.verify(make_token(logins, rotated))
+
+    for label, seconds in timings.items():
+        print(f"{label:>20}: {seconds * 1000:.3f} ms/login")
+    print(f"stand-in requests: {handler.hits}; {verifier.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
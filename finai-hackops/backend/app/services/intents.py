@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import sys
+import time
+
+# Optional JSON file that extends the keyword tables without a code change, e.g.
+# {"routing": {"SALARY_PLAN": ["payslip"]}, "fallback": {"SAVINGS": ["emergency fund"]}}
+INTENTS_PATH = os.getenv('FINAI_INTENTS_PATH', '')
+
+# Keywords match whole words; a trailing * matches any word starting with the stem,
+# and spaces in a phrase match any run of whitespace. Earlier intents win ties.
+ROUTING_INTENTS = {
+    "SALARY_PLAN": ["salary", "salaries", "plan", "plans", "planned", "planner*", "planning", "recommend*",
+                    "advice", "advise", "budget plan"],
+    "EXPENSE_ANALYSIS": ["spend*", "spent", "expense*", "cost", "costs", "costly", "costing", "breakdown*",
+                         "analysis", "analyze", "analyse"],
+}
+
+FALLBACK_INTENTS = {
+    "GREETING": ["hello", "hi", "hey", "hola"],
+    "PLANNING": ["salary", "salaries", "plan", "plans", "planned", "planner*", "planning", "recommend*",
+                 "advice", "advise", "budget*"],
+    "SAVINGS": ["save*", "saving*"],
+    "INVESTMENT": ["invest*", "reinvest*", "stock*"],
+}
+
+
+def keyword_pattern(keyword):
+    keyword = keyword.strip().lower()
+    stem = keyword.endswith("*")
+    words = keyword.rstrip("*").split()
+    return r"\s+".join(re.escape(word) for word in words) + (r"\w*" if stem else r"\b")
+
+
+class IntentClassifier:
+    """
+    Scores every intent in one pass over the message. All keywords are compiled into
+    a single non-capturing alternation; each hit is mapped back to its intents by
+    dictionary lookup, with stem matches resolved once and memoized.
+    """
+
+    # Bound on memoized stem matches ("spending", "investments", ...)
+    MAX_RESOLVED = 4096
+
+    def __init__(self, table, default="GENERAL"):
+        self.default = default
+        self.intents = list(table)
+        self._priority = {intent: i for i, intent in enumerate(self.intents)}
+
+        self._exact = {}
+        stems = {}
+        for intent, keywords in table.items():
+            for keyword in keywords:
+                keyword = keyword.strip().lower()
+                if keyword.endswith("*"):
+                    owners = stems.setdefault(" ".join(keyword.rstrip("*").split()), [])
+                else:
+                    owners = self._exact.setdefault(" ".join(keyword.split()), [])
+                if intent not in owners:
+                    owners.append(intent)
+        # Longest stem first so the most specific one claims a word
+        self._stems = sorted(stems.items(), key=lambda item: len(item[0]), reverse=True)
+        self._resolved = {}
+
+        # Longest first so "budget plan" is tried before "budget*"
+        keywords = sorted(list(self._exact) + [stem + "*" for stem in stems], key=len, reverse=True)
+        self.pattern = re.compile(
+            r"\b(?:" + "|".join(keyword_pattern(k) for k in keywords) + ")"
+        ) if keywords else None
+
+    def _intents_for(self, text):
+        text = " ".join(text.split())
+        owners = self._exact.get(text)
+        if owners is not None:
+            return owners
+        owners = self._resolved.get(text)
+        if owners is None:
+            owners = next((o for stem, o in self._stems if text.startswith(stem)), [])
+            if len(self._resolved) < self.MAX_RESOLVED:
+                self._resolved[text] = owners
+        return owners
+
+    def scores(self, message):
+        """Intents ranked by keyword hits, as (intent, score) pairs; empty when nothing matches"""
+        if self.pattern is None:
+            return []
+        counts = {}
+        for text in self.pattern.findall(message.lower()):
+            for intent in self._intents_for(text):
+                counts[intent] = counts.get(intent, 0) + 1
+        return sorted(counts.items(), key=lambda item: (-item[1], self._priority[item[0]]))
+
+    def classify(self, message):
+        ranked = self.scores(message)
+        return ranked[0][0] if ranked else self.default
+
+
+def load_tables(path=INTENTS_PATH):
+    """Default keyword tables merged with the optional config file"""
+    tables = {
+        "routing": {intent: list(keywords) for intent, keywords in ROUTING_INTENTS.items()},
+        "fallback": {intent: list(keywords) for intent, keywords in FALLBACK_INTENTS.items()},
+    }
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        for name, table in tables.items():
+            for intent, keywords in config.get(name, {}).items():
+                table.setdefault(intent, []).extend(keywords)
+    return tables
+
+
+_tables = load_tables()
+routing_classifier = IntentClassifier(_tables["routing"])
+fallback_classifier = IntentClassifier(_tables["fallback"])
+
+
+SAMPLE_MESSAGES = [
+    "Hi there!",
+    "Can you give me a salary plan for next month?",
+    "What's the breakdown of my spending this month?",
+    "How much did I spend on food?",
+    "I need advice on how to save more money",
+    "Should I invest in stocks or index funds?",
+    "Can you give me an explanation of my expenses?",
+    "hello, what can you do?",
+    "My rent costs too much, what do you recommend?",
+    "Show me an analysis of my transport expenses",
+    "Is my emergency fund big enough?",
+    "What is a good savings rate for someone earning 50000?",
+]
+
+
+def _legacy_detect_intent(message):
+    msg = message.lower()
+    if any(w in msg for w in ["salary", "plan", "recommendation", "advice", "budget plan"]):
+        return "SALARY_PLAN"
+    if any(w in msg for w in ["spend", "expense", "cost", "breakdown", "analysis"]):
+        return "EXPENSE_ANALYSIS"
+    return "GENERAL"
+
+
+def benchmark(messages, repeat=20000):
+    """Messages per second for the substring scan this replaced and for the compiled classifier"""
+    corpus = (messages * (repeat // len(messages) + 1))[:repeat]
+    results = {}
+    for name, classify in (("substring", _legacy_detect_intent), ("compiled", routing_classifier.classify)):
+        started = time.perf_counter()
+        for message in corpus:
+            classify(message)
+        results[name] = len(corpus) / (time.perf_counter() - started)
+    return results
+
+
+if __name__ == "__main__":
+    # python -m app.services.intents [messages.txt]  (one chat message per line)
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            messages = [line.strip() for line in f if line.strip()]
+    else:
+        messages = SAMPLE_MESSAGES
+
+    for message in messages[:len(SAMPLE_MESSAGES)]:
+        print(f"{routing_classifier.classify(message):<17} {fallback_classifier.classify(message):<11} "
+              f"{routing_classifier.scores(message)}  {message!r}")
+    for name, rate in benchmark(messages).items():
+        print(f"{name:>9}: {rate:,.0f} messages/s")
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_TTL = float(os.getenv('FINAI_LLM_CACHE_TTL', '3600'))
+LLM_CACHE_SIZE = int(os.getenv('FINAI_LLM_CACHE_SIZE', '1024'))
+# Optional SQLite file that keeps responses across restarts and workers (empty = memory only)
+LLM_CACHE_PATH = os.getenv('FINAI_LLM_CACHE_PATH', '')
+# Expired rows are deleted from the SQLite store at most this often
+LLM_CACHE_PURGE_INTERVAL = float(os.getenv('FINAI_LLM_CACHE_PURGE_INTERVAL', '300'))
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return " ".join(prompt.split())
+
+
+def cache_key(prompt, namespace=""):
+    return hashlib.sha256(f"{namespace}\0{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed LLM response cache with TTL, LRU eviction and an optional SQLite store.
+    Async callers use get_async/set_async, which keep the SQLite reads and writes off the event loop.
+    """
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_SIZE, path=LLM_CACHE_PATH, namespace=""):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or None
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        self._disk_lock = threading.Lock()
+        self._last_purge = 0.0
+        if self.path:
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at)")
+            self._conn.commit()
+
+    def get(self, prompt):
+        key = cache_key(prompt, self.namespace)
+        now = time.time()
+        response = self._memory_get(key, now)
+        if response is None and self._conn is not None:
+            response = self._disk_get(key, now)
+        if response is None:
+            with self._lock:
+                self.misses += 1
+        return response
+
+    async def get_async(self, prompt):
+        key = cache_key(prompt, self.namespace)
+        now = time.time()
+        response = self._memory_get(key, now)
+        if response is None and self._conn is not None:
+            response = await asyncio.to_thread(self._disk_get, key, now)
+        if response is None:
+            with self._lock:
+                self.misses += 1
+        return response
+
+    def set(self, prompt, response):
+        key = cache_key(prompt, self.namespace)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, response, expires_at)
+        if self._conn is not None:
+            self._disk_set(key, response, expires_at)
+
+    async def set_async(self, prompt, response):
+        key = cache_key(prompt, self.namespace)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, response, expires_at)
+        if self._conn is not None:
+            await asyncio.to_thread(self._disk_set, key, response, expires_at)
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+        return None
+
+    def _disk_get(self, key, now):
+        with self._disk_lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        if not row:
+            return None
+        with self._lock:
+            self._store(key, row[0], row[1])
+            self.hits += 1
+            self.disk_hits += 1
+        return row[0]
+
+    def _disk_set(self, key, response, expires_at):
+        with self._disk_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, expires_at)
+            )
+            now = time.time()
+            if now - self._last_purge >= LLM_CACHE_PURGE_INTERVAL:
+                self._last_purge = now
+                self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+    def _store(self, key, response, expires_at):
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "persistent": bool(self.path),
+            }
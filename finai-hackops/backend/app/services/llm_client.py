@@ -0,0 +1,214 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LLM_TIMEOUT = float(os.getenv('FINAI_LLM_TIMEOUT', '20'))
+LLM_MAX_CONCURRENCY = int(os.getenv('FINAI_LLM_MAX_CONCURRENCY', '8'))
+LLM_RETRIES = int(os.getenv('FINAI_LLM_RETRIES', '2'))
+LLM_BACKOFF_BASE = float(os.getenv('FINAI_LLM_BACKOFF_BASE', '0.5'))
+LLM_BACKOFF_MAX = float(os.getenv('FINAI_LLM_BACKOFF_MAX', '4'))
+LLM_BREAKER_FAILURES = int(os.getenv('FINAI_LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET = float(os.getenv('FINAI_LLM_BREAKER_RESET', '30'))
+
+
+class LLMUnavailable(Exception):
+    """The remote model is failing, too slow, or short-circuited; callers use local responses"""
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures, then lets a single probe through once reset_timeout passes.
+    A probe that hasn't reported back within reset_timeout is presumed lost and another is allowed.
+    """
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if ((self.state == "open" and now - self.opened_at >= self.reset_timeout)
+                    or (self.state == "half_open" and now - self.probe_started >= self.reset_timeout)):
+                self.state = "half_open"
+                self.probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        """A call was cancelled before finishing; an unfinished probe counts as a failure"""
+        with self._lock:
+            probing = self.state == "half_open"
+        if probing:
+            self.record_failure()
+
+
+class LatencyHistogram:
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def observe(self, seconds, ok=True):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.BUCKETS_MS) if ms <= bound), len(self.BUCKETS_MS))
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        if not ok:
+            self.errors += 1
+
+    def snapshot(self):
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class AsyncLLMClient:
+    """
+    Non-blocking wrapper around a generate_content-style model.
+    Each call is bounded by a timeout and a concurrency semaphore, retried with
+    jittered exponential backoff, and short-circuited while the breaker is open.
+    """
+
+    def __init__(self, model, timeout=LLM_TIMEOUT, max_concurrency=LLM_MAX_CONCURRENCY,
+                 retries=LLM_RETRIES, backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX,
+                 breaker=None):
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.histograms = {}
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Only used for models without a native async API
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="finai-llm")
+
+    async def _call(self, prompt):
+        if hasattr(self.model, 'generate_content_async'):
+            response = await self.model.generate_content_async(prompt)
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self._executor, self.model.generate_content, prompt)
+        return response.text
+
+    async def generate(self, method, prompt):
+        """Return the model's text for prompt, or raise LLMUnavailable"""
+        histogram = self.histograms.setdefault(method, LatencyHistogram())
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise LLMUnavailable(f"{method}: circuit open" + (f" after {last_error!r}" if last_error else ""))
+
+            async with self._semaphore:
+                self.in_flight += 1
+                started = time.perf_counter()
+                try:
+                    text = await asyncio.wait_for(self._call(prompt), self.timeout)
+                except Exception as e:
+                    histogram.observe(time.perf_counter() - started, ok=False)
+                    self.breaker.record_failure()
+                    last_error = e if not isinstance(e, asyncio.TimeoutError) else TimeoutError(f"timed out after {self.timeout}s")
+                except BaseException:
+                    # Cancelled (e.g. the client went away); don't leave a probe outstanding
+                    self.breaker.record_abandoned()
+                    raise
+                else:
+                    histogram.observe(time.perf_counter() - started)
+                    self.breaker.record_success()
+                    return text
+                finally:
+                    self.in_flight -= 1
+
+            if attempt < self.retries:
+                # Full jitter keeps retrying clients from synchronizing
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+        raise LLMUnavailable(f"{method} failed after {self.retries + 1} attempts: {last_error!r}")
+
+    async def stream(self, method, prompt):
+        """
+        Yield text chunks as the model produces them. Each chunk must arrive within the
+        timeout; failures raise LLMUnavailable. Streams are not retried, since chunks
+        may already have reached the client.
+        """
+        histogram = self.histograms.setdefault(method, LatencyHistogram())
+        if not self.breaker.allow():
+            raise LLMUnavailable(f"{method}: circuit open")
+
+        async with self._semaphore:
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                if hasattr(self.model, 'generate_content_async'):
+                    response = await asyncio.wait_for(self.model.generate_content_async(prompt, stream=True), self.timeout)
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        if chunk.text:
+                            yield chunk.text
+                else:
+                    yield await asyncio.wait_for(self._call(prompt), self.timeout)
+            except Exception as e:
+                histogram.observe(time.perf_counter() - started, ok=False)
+                self.breaker.record_failure()
+                raise LLMUnavailable(f"{method} stream failed: {e!r}") from e
+            except BaseException:
+                # Cancelled, or closed early when the SSE client disconnects
+                self.breaker.record_abandoned()
+                raise
+            else:
+                histogram.observe(time.perf_counter() - started)
+                self.breaker.record_success()
+            finally:
+                self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "timeout_s": self.timeout,
+            "methods": {method: h.snapshot() for method, h in self.histograms.items()},
+        }
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import random
+import time
+
+# Stand-in for the Gemini model so the async client, breaker and fallbacks can be
+# exercised locally. Enable with FINAI_LLM_BACKEND=stub.
+STUB_DELAY = float(os.getenv('FINAI_LLM_STUB_DELAY', '0.05'))
+STUB_FAILURE_RATE = float(os.getenv('FINAI_LLM_STUB_FAILURE_RATE', '0'))
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """generate_content/generate_content_async with configurable latency and failure rate"""
+
+    def __init__(self, delay=STUB_DELAY, failure_rate=STUB_FAILURE_RATE, seed=None):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def _respond(self, prompt):
+        self.calls += 1
+        if self._random.random() < self.failure_rate:
+            raise RuntimeError("stub model failure")
+        return StubResponse(f"Stub response ({len(prompt)} prompt chars): keep tracking your spending!")
+
+    def generate_content(self, prompt):
+        time.sleep(self.delay)
+        return self._respond(prompt)
+
+    async def generate_content_async(self, prompt, stream=False):
+        await asyncio.sleep(self.delay)
+        response = self._respond(prompt)
+        if not stream:
+            return response
+        return self._stream_words(response.text)
+
+    async def _stream_words(self, text):
+        for word in text.split(" "):
+            yield StubResponse(word + " ")
+            await asyncio.sleep(self.delay / 10)
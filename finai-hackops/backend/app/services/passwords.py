@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt cost: N (CPU/memory, a power of two), r (block size), p (parallelism).
+# Raising any of them makes new hashes slower; older hashes are upgraded on login.
+SCRYPT_N = int(os.getenv('FINAI_SCRYPT_N', '16384'))
+SCRYPT_R = int(os.getenv('FINAI_SCRYPT_R', '8'))
+SCRYPT_P = int(os.getenv('FINAI_SCRYPT_P', '1'))
+# Threads hashing at once; hashlib.scrypt releases the GIL, so they run in parallel
+PASSWORD_WORKERS = int(os.getenv('FINAI_PASSWORD_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+SCHEME = "scrypt"
+# Placeholder format written before real hashing existed; upgraded on the next successful login
+LEGACY_PREFIX = "hashed_"
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """
+    scrypt password hashing on a bounded thread pool, so the KDF never runs on the
+    event loop. Hashes look like scrypt$N$r$p$salt$key, which lets verify() tell when
+    a stored hash was made with different cost parameters and should be replaced.
+    """
+
+    def __init__(self, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, workers=PASSWORD_WORKERS):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.hashes = 0
+        self.rehashes = 0
+        self.total_ms = 0.0
+        # Compared against when the account doesn't exist, so response time doesn't reveal it
+        self._dummy_hash = None
+
+    def _derive(self, password, salt, n, r, p):
+        started = time.perf_counter()
+        key = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                             maxmem=256 * n * r * p, dklen=KEY_BYTES)
+        with self._lock:
+            self.hashes += 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+        return key
+
+    def hash(self, password):
+        salt = secrets.token_bytes(SALT_BYTES)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{SCHEME}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(key)}"
+
+    def needs_rehash(self, stored):
+        return not stored.startswith(f"{SCHEME}${self.n}${self.r}${self.p}$")
+
+    def verify(self, password, stored):
+        if stored is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hash(secrets.token_urlsafe(16))
+            self.verify(password, self._dummy_hash)
+            return False
+        if stored.startswith(LEGACY_PREFIX):
+            return hmac.compare_digest(stored.encode("utf-8"), f"{LEGACY_PREFIX}{password}".encode("utf-8"))
+        try:
+            scheme, n, r, p, salt, key = stored.split("$")
+            if scheme != SCHEME:
+                return False
+            expected = _unb64(key)
+            actual = self._derive(password, _unb64(salt), int(n), int(r), int(p))
+        except ValueError:
+            # Not a password hash (e.g. the Google sign-in placeholder)
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    def verify_and_update(self, password, stored):
+        """(matches, replacement hash or None) - a replacement is returned when the cost parameters changed"""
+        if not self.verify(password, stored):
+            return False, None
+        if self.needs_rehash(stored):
+            with self._lock:
+                self.rehashes += 1
+            return True, self.hash(password)
+        return True, None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="finai-password")
+            return self._executor
+
+    async def hash_async(self, password):
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), self.hash, password)
+
+    async def verify_and_update_async(self, password, stored):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), self.verify_and_update, password, stored
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scheme": SCHEME,
+                "n": self.n,
+                "r": self.r,
+                "p": self.p,
+                "workers": self.workers,
+                "hashes": self.hashes,
+                "rehashes": self.rehashes,
+                "mean_ms": round(self.total_ms / self.hashes, 3) if self.hashes else None,
+            }
+
+
+password_hasher = PasswordHasher()
+
+
+def benchmark(target_rate, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, seconds=2.0):
+    """Logins/sec for increasing pool sizes; returns the smallest pool that reaches target_rate"""
+    print(f"scrypt N={n} r={r} p={p}; target {target_rate:g} logins/s")
+    stored = PasswordHasher(n, r, p).hash("correct horse battery staple")
+    chosen = None
+    for workers in range(1, (os.cpu_count() or 1) * 2 + 1):
+        hasher = PasswordHasher(n, r, p, workers=workers)
+        done = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while time.perf_counter() - started < seconds:
+                done += sum(executor.map(lambda _: hasher.verify("correct horse battery staple", stored),
+                                         range(workers * 4)))
+        rate = done / (time.perf_counter() - started)
+        print(f"  workers={workers:<3} {rate:8.1f} logins/s  ({hasher.stats()['mean_ms']:.1f} ms per hash)")
+        if rate >= target_rate:
+            chosen = workers
+            break
+    if chosen:
+        print(f"Set FINAI_PASSWORD_WORKERS={chosen}")
+    else:
+        print("Target not reachable on this machine at this cost; lower FINAI_SCRYPT_N or add CPUs.")
+    return chosen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Size the password hashing pool for a target login rate")
+    parser.add_argument("--target", type=float, default=50, help="Logins per second to sustain")
+    parser.add_argument("--n", type=int, default=SCRYPT_N)
+    parser.add_argument("--r", type=int, default=SCRYPT_R)
+    parser.add_argument("--p", type=int, default=SCRYPT_P)
+    args = parser.parse_args()
+    benchmark(args.target, args.n, args.r, args.p)
@@ -1,65 +1,15 @@
-import sqlite3
 import os
+from app.db.database import Database
+from app.db.migrations import migrate
 
 def init_db():
     db_path = os.path.join(os.path.dirname(__file__), 'finai_dev.db')
     print(f"Initializing database at {db_path}...")
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.executescript("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL
-    );
 
-    CREATE TABLE IF NOT EXISTS transactions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        transaction_type TEXT NOT NULL,
-        amount REAL NOT NULL,
-        category TEXT NOT NULL,
-        description TEXT,
-        transaction_date DATE NOT NULL,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    );
+    # The schema lives in app/db/migrations.py; this applies whatever is pending
+    for version, name in migrate(Database(db_path)):
+        print(f"Applied migration {version}: {name}")
 
-    CREATE TABLE IF NOT EXISTS ai_analysis (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        analysis_type TEXT NOT NULL,
-        prompt TEXT,
-        ai_response TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    );
-
-    CREATE TABLE IF NOT EXISTS chat_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        message TEXT NOT NULL,
-        sender TEXT NOT NULL,
-        session_id TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    );
-
-    CREATE TABLE IF NOT EXISTS budgets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        category TEXT NOT NULL,
-        budget_amount REAL NOT NULL,
-        spent_amount REAL DEFAULT 0,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    );
-    """)
-    
-    conn.commit()
-    conn.close()
     print("Database initialization complete.")
 
 if __name__ == "__main__":